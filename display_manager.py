@@ -7,6 +7,8 @@ import os
 import json
 import time
 import math
+import bisect
+import queue
 import threading
 from datetime import datetime, timedelta
 from PIL import Image, ImageDraw, ImageFont
@@ -14,6 +16,8 @@ from PIL import Image, ImageDraw, ImageFont
 # Global display variables
 display = None
 display_config = {}
+display_type = None  # Set once by init_display()
+config_mtime = None  # mtime of config.json when display_config was loaded
 current_screen = 0
 display_enabled = False
 current_brightness = 5  # Brightness level 1-8 (8 different levels)
@@ -21,6 +25,8 @@ showing_control_overlay = False
 control_overlay_type = None  # 'brightness' or 'volume'
 control_overlay_time = 0
 control_value = 0
+frame_image = None  # Persistent OLED canvas, reused every frame
+framebuffer = None  # SSD1306 page-layout bytes for frame_image
 
 # Shared state from main app
 playback_state = {
@@ -34,12 +40,126 @@ schedules_data = []
 sensor_data_ref = None
 volume_callback = None  # Callback to set volume in main app
 
+# Set when shared state changes so the display loop re-renders right away
+display_wake = threading.Event()
+joystick_events = queue.Queue()  # Filled by the joystick thread
+
+# Fonts and pre-rendered labels, built once and reused every frame
+FONT_DIR = "/usr/share/fonts/truetype/dejavu"
+LABEL_CACHE_SIZE = 64
+font_cache = {}
+label_cache = {}
+
+# Sine lookup table for the LED animations (one period, power-of-two size)
+SIN_TABLE_SIZE = 256
+SIN_TABLE = tuple(math.sin(2 * math.pi * i / SIN_TABLE_SIZE) for i in range(SIN_TABLE_SIZE))
+SIN_TABLE_SCALE = SIN_TABLE_SIZE / (2 * math.pi)
+
+
+def fast_sin(x):
+    """Approximate math.sin(x) with a table lookup (for animations only)"""
+    return SIN_TABLE[int(x * SIN_TABLE_SCALE) & (SIN_TABLE_SIZE - 1)]
+
+
+def build_visualizer_frames(phases):
+    """Pre-compute the lit (pixel index, color) cells of each visualizer phase"""
+    frames = []
+    for phase in range(phases):
+        cells = []
+        for x in range(8):
+            # Each column bounces at different frequency
+            height = 3 + int(2 * abs(math.sin(2 * math.pi * phase / phases + x * 0.7)))
+            
+            for y in range(6 - height, 6):
+                # Color gradient from bottom (green) to top (red)
+                if y >= 4:
+                    color = (0, 200, 50)  # Green bottom
+                elif y >= 2:
+                    color = (200, 200, 0)  # Yellow middle
+                else:
+                    color = (255, 100, 0)  # Orange top
+                cells.append((y * 8 + x, color))
+        frames.append(tuple(cells))
+    return tuple(frames)
+
+
+VISUALIZER_PHASES = 32
+VISUALIZER_FRAMES = build_visualizer_frames(VISUALIZER_PHASES)
+
+
+def build_fill_table(rows):
+    """Pre-compute the pixel indices lit at each fill level as rows fill up in order"""
+    table = [()]
+    cells = []
+    for row in rows:
+        cells += [y * 8 + x for x, y in row if y * 8 + x not in cells]
+        table.append(tuple(cells))
+    return tuple(table)
+
+
+# Hourglass for the countdown screen, as pixel indices
+HOURGLASS_OUTLINE = (
+    0, 1, 2, 3, 4, 5, 6, 7,  # Top rim
+    9, 10, 11, 12, 13, 14,  # Top funnel
+    18, 19, 20, 21,
+    27, 28,  # Narrow middle
+    34, 35, 36, 37,
+    41, 42, 43, 44, 45, 46,  # Bottom funnel
+    48, 49, 50, 51, 52, 53, 54, 55,  # Bottom rim
+)
+
+# Countdown colors by urgency band (< 10 min, < 30 min, more), as
+# (scale, base) per channel: color = base + scale * glow
+URGENCY_BANDS = (10, 30)
+SAND_COLORS = (
+    (255, 50, 0),  # Bright red - urgent!
+    (255, 150, 0),  # Orange
+    (100, 200, 255),  # Blue - plenty of time
+)
+OUTLINE_COLORS = (
+    ((0, 1, 0), (255, 0, 0)),  # Glowing red/yellow
+    ((0, 0, 0), (200, 150, 50)),
+    ((0, 0, 0), (50, 100, 150)),
+)
+
+# Heart colors by temperature band (< 16, < 18, < 22, < 26, < 28, hotter),
+# as (scale, base) per channel: color = base + scale * pulse
+TEMP_BANDS = (16, 18, 22, 26, 28)
+HEART_COLORS = (
+    ((0, 0, 1), (0, 100, 0)),  # Very cold - bright blue
+    ((0, 0.5, 1), (0, 0, 0)),  # Cold - light blue
+    ((0, 1, 1), (0, 0, 0)),  # Cool - cyan
+    ((0.5, 1, 0), (0, 0, 0)),  # Comfortable - green/yellow
+    ((1, 0.5, 0), (0, 0, 0)),  # Warm - orange
+    ((1, 0, 0), (0, 0, 0)),  # Hot - red
+)
+
+# Sand in top chamber (rows 1-2), indexed by fill level 0-3
+TOP_SAND_BY_FILL = build_fill_table([
+    [(2, 1), (3, 1), (4, 1), (5, 1)],
+    [(3, 2), (4, 2)],
+    [],
+])
+
+# Sand in bottom chamber (rows 4-6), indexed by fill level 0-4
+BOTTOM_SAND_BY_FILL = build_fill_table([
+    [(1, 6), (2, 6), (3, 6), (4, 6), (5, 6), (6, 6)],  # Bottom row
+    [(2, 5), (3, 5), (4, 5), (5, 5)],  # Second from bottom
+    [],  # Third level adds no new cells
+    [(3, 4), (4, 4)],  # Fourth from bottom
+])
+
 
 def load_config():
     """Load display configuration from config.json"""
-    global display_config
+    global display_config, config_mtime
     config_file = os.path.join(os.path.dirname(__file__), 'config.json')
     if os.path.exists(config_file):
+        # Only re-parse the file when it has changed
+        mtime = os.path.getmtime(config_file)
+        if mtime == config_mtime:
+            return display_config
+        config_mtime = mtime
         with open(config_file, 'r') as f:
             config = json.load(f)
             display_config = config.get('display', {})
@@ -57,7 +177,7 @@ def load_config():
 
 def init_display():
     """Initialize the display (SSD1306 OLED or Sense HAT LED matrix)"""
-    global display, display_enabled, display_config
+    global display, display_enabled, display_config, display_type, frame_image, framebuffer
     
     display_config = load_config()
     
@@ -77,28 +197,30 @@ def init_display():
             display.clear()
             # Set initial brightness (will be controlled by apply_brightness)
             
+            # Joystick is read by its own thread so presses don't wait for a render tick
+            threading.Thread(target=joystick_loop, daemon=True, name="JoystickThread").start()
+            
             print("✓ Sense HAT LED matrix initialized (8x8, rotated 180°)")
             display_enabled = True
             return True
             
         elif display_type == 'ssd1306':
-            import board
-            import adafruit_ssd1306
-            
-            # Initialize I2C
-            i2c = board.I2C()
+            from luma.core.interface.serial import i2c
+            from luma.oled.device import ssd1306
             
             # Get display dimensions
             width = display_config.get('width', 128)
             height = display_config.get('height', 64)
             i2c_addr = int(display_config.get('i2c_address', '0x3C'), 16)
             
-            # Initialize display
-            display = adafruit_ssd1306.SSD1306_I2C(width, height, i2c, addr=i2c_addr)
+            # Initialize display (luma sends the framebuffer as I2C block writes)
+            display = ssd1306(i2c(port=1, address=i2c_addr), width=width, height=height)
             
             # Clear display
-            display.fill(0)
-            display.show()
+            display.clear()
+            
+            frame_image = Image.new('1', (width, height))
+            framebuffer = bytearray(width * height // 8)
             
             print(f"✓ SSD1306 display initialized ({width}x{height} at {display_config.get('i2c_address')})")
             display_enabled = True
@@ -107,13 +229,55 @@ def init_display():
     except ImportError as e:
         print(f"⚠ Display libraries not installed: {e}")
         print("  For Sense HAT: pip install sense-hat")
-        print("  For SSD1306: pip install adafruit-circuitpython-ssd1306 Pillow")
+        print("  For SSD1306: pip install luma.oled Pillow")
         return False
     except Exception as e:
         print(f"⚠ Could not initialize display: {e}")
         return False
 
 
+def get_font(name, size):
+    """Load a TrueType font once, falling back to Pillow's default font"""
+    key = (name, size)
+    if key not in font_cache:
+        try:
+            font_cache[key] = ImageFont.truetype(os.path.join(FONT_DIR, name), size)
+        except:
+            font_cache[key] = ImageFont.load_default()
+    return font_cache[key]
+
+
+def draw_label(draw, xy, text, font):
+    """Draw text from a cached bitmap (for strings that repeat every frame)"""
+    key = (font, text)
+    bitmap = label_cache.get(key)
+    if bitmap is None:
+        if len(label_cache) >= LABEL_CACHE_SIZE:
+            label_cache.clear()
+        right, bottom = font.getbbox(text, mode='1')[2:]
+        bitmap = Image.new('1', (max(right, 1), max(bottom, 1)))
+        ImageDraw.Draw(bitmap).text((0, 0), text, font=font, fill=255)
+        label_cache[key] = bitmap
+    draw.bitmap(xy, bitmap, fill=255)
+
+
+def write_framebuffer(image):
+    """Send a '1' mode image to the SSD1306 in its native page layout"""
+    width, height = image.size
+    pages = height // 8
+    col_start = (128 - width) // 2
+    
+    # Rotating 270 degrees packs each pixel column into bytes (top pixel in
+    # the lowest bit); interleave them into pages without a per-pixel loop
+    raw = image.transpose(Image.ROTATE_270).tobytes()
+    for page in range(pages):
+        framebuffer[page * width:(page + 1) * width] = raw[pages - 1 - page::pages]
+    
+    display.command(0x21, col_start, col_start + width - 1,  # COLUMNADDR
+                    0x22, 0, pages - 1)  # PAGEADDR
+    display.data(list(framebuffer))
+
+
 def get_next_schedule():
     """Calculate time until next scheduled song"""
     global schedules_data
@@ -156,24 +320,20 @@ def get_next_schedule():
 
 def render_countdown_screen(draw, width, height):
     """Render countdown to next schedule"""
-    try:
-        font_large = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 20)
-        font_small = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 12)
-    except:
-        font_large = ImageFont.load_default()
-        font_small = ImageFont.load_default()
+    font_large = get_font("DejaVuSans-Bold.ttf", 20)
+    font_small = get_font("DejaVuSans.ttf", 12)
     
     next_schedule, countdown = get_next_schedule()
     
     if next_schedule:
         # Draw title
-        draw.text((2, 2), "NEXT SCHEDULE:", font=font_small, fill=255)
+        draw_label(draw, (2, 2), "NEXT SCHEDULE:", font_small)
         
         # Draw schedule name (truncate if needed)
         name = next_schedule['name']
         if len(name) > 15:
             name = name[:15] + "..."
-        draw.text((2, 16), name, font=font_small, fill=255)
+        draw_label(draw, (2, 16), name, font_small)
         
         # Draw countdown timer
         draw.text((2, 32), countdown, font=font_large, fill=255)
@@ -182,28 +342,24 @@ def render_countdown_screen(draw, width, height):
         time_str = f"{next_schedule['hour']:02d}:{next_schedule['minute']:02d}"
         draw.text((2, 54), f"@ {time_str}", font=font_small, fill=255)
     else:
-        draw.text((2, 24), "No schedules", font=font_small, fill=255)
-        draw.text((2, 38), "upcoming", font=font_small, fill=255)
+        draw_label(draw, (2, 24), "No schedules", font_small)
+        draw_label(draw, (2, 38), "upcoming", font_small)
 
 
 def render_playing_screen(draw, width, height):
     """Render currently playing song with progress"""
-    try:
-        font_small = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 11)
-        font_tiny = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 9)
-    except:
-        font_small = ImageFont.load_default()
-        font_tiny = ImageFont.load_default()
+    font_small = get_font("DejaVuSans.ttf", 11)
+    font_tiny = get_font("DejaVuSans.ttf", 9)
     
     if playback_state.get('playing') and playback_state.get('current_song'):
         # Draw "NOW PLAYING"
-        draw.text((2, 2), "NOW PLAYING:", font=font_tiny, fill=255)
+        draw_label(draw, (2, 2), "NOW PLAYING:", font_tiny)
         
         # Draw song name (truncate if needed)
         song = playback_state['current_song']
         if len(song) > 20:
             song = song[:20] + "..."
-        draw.text((2, 14), song, font=font_small, fill=255)
+        draw_label(draw, (2, 14), song, font_small)
         
         # Draw progress bar
         if playback_state.get('duration', 0) > 0:
@@ -234,61 +390,53 @@ def render_playing_screen(draw, width, height):
             draw.text((4, 52), time_str, font=font_tiny, fill=255)
     else:
         # Idle screen
-        draw.text((20, 24), "♪ IDLE ♪", font=font_small, fill=255)
+        draw_label(draw, (20, 24), "♪ IDLE ♪", font_small)
 
 
 def render_sensor_screen(draw, width, height):
     """Render temperature and humidity"""
     global sensor_data_ref
     
-    try:
-        font_large = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 18)
-        font_small = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 11)
-    except:
-        font_large = ImageFont.load_default()
-        font_small = ImageFont.load_default()
+    font_large = get_font("DejaVuSans-Bold.ttf", 18)
+    font_small = get_font("DejaVuSans.ttf", 11)
     
     if sensor_data_ref and sensor_data_ref.get('sensor_available'):
         # Draw temperature
         temp = sensor_data_ref.get('temperature')
         if temp is not None:
-            draw.text((2, 2), "Temperature:", font=font_small, fill=255)
+            draw_label(draw, (2, 2), "Temperature:", font_small)
             draw.text((2, 16), f"{temp:.1f}°C", font=font_large, fill=255)
         
         # Draw humidity
         humidity = sensor_data_ref.get('humidity')
         if humidity is not None:
-            draw.text((2, 38), "Humidity:", font=font_small, fill=255)
+            draw_label(draw, (2, 38), "Humidity:", font_small)
             draw.text((2, 50), f"{humidity:.1f}%", font=font_large, fill=255)
     else:
-        draw.text((2, 24), "No sensor data", font=font_small, fill=255)
+        draw_label(draw, (2, 24), "No sensor data", font_small)
 
 
 def render_combined_screen(draw, width, height):
     """Render all info in one compact view"""
-    try:
-        font_tiny = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 9)
-    except:
-        font_tiny = ImageFont.load_default()
+    font_tiny = get_font("DejaVuSans.ttf", 9)
     
-    y_pos = 2
+    # Collect lines and lay them out in a single text call
+    lines = []
     
     # Current time
     now = datetime.now()
     time_str = now.strftime("%H:%M:%S")
     date_str = now.strftime("%m/%d")
-    draw.text((2, y_pos), f"{time_str} {date_str}", font=font_tiny, fill=255)
-    y_pos += 12
+    lines.append(f"{time_str} {date_str}")
     
     # Playing status
     if playback_state.get('playing'):
         song = playback_state['current_song']
         if len(song) > 18:
             song = song[:18] + "..."
-        draw.text((2, y_pos), f"♪ {song}", font=font_tiny, fill=255)
+        lines.append(f"♪ {song}")
     else:
-        draw.text((2, y_pos), "♪ Idle", font=font_tiny, fill=255)
-    y_pos += 12
+        lines.append("♪ Idle")
     
     # Next schedule
     next_schedule, countdown = get_next_schedule()
@@ -296,19 +444,19 @@ def render_combined_screen(draw, width, height):
         name = next_schedule['name']
         if len(name) > 12:
             name = name[:12] + "..."
-        draw.text((2, y_pos), f"Next: {name}", font=font_tiny, fill=255)
-        y_pos += 10
-        draw.text((2, y_pos), f"In: {countdown}", font=font_tiny, fill=255)
+        lines.append(f"Next: {name}")
+        lines.append(f"In: {countdown}")
     else:
-        draw.text((2, y_pos), "Next: None", font=font_tiny, fill=255)
-    y_pos += 12
+        lines.append("Next: None")
     
     # Sensor data
     if sensor_data_ref and sensor_data_ref.get('sensor_available'):
         temp = sensor_data_ref.get('temperature')
         humidity = sensor_data_ref.get('humidity')
         if temp and humidity:
-            draw.text((2, y_pos), f"Env: {temp:.1f}°C {humidity:.0f}%", font=font_tiny, fill=255)
+            lines.append(f"Env: {temp:.1f}°C {humidity:.0f}%")
+    
+    draw.multiline_text((2, 2), "\n".join(lines), font=font_tiny, fill=255, spacing=3)
 
 
 def render_sense_hat_countdown():
@@ -316,7 +464,6 @@ def render_sense_hat_countdown():
     global display
     
     next_schedule, countdown = get_next_schedule()
-    display.clear()
     
     if next_schedule and countdown:
         import time
@@ -331,18 +478,6 @@ def render_sense_hat_countdown():
             # Animate sand falling - pulsing effect
             pulse = (int(time.time() * 3) % 10) / 10.0
             
-            # Hourglass outline
-            outline = [
-                [1,1,1,1,1,1,1,1],  # Top rim
-                [0,1,1,1,1,1,1,0],  # Top funnel
-                [0,0,1,1,1,1,0,0],
-                [0,0,0,1,1,0,0,0],  # Narrow middle
-                [0,0,1,1,1,1,0,0],
-                [0,1,1,1,1,1,1,0],  # Bottom funnel
-                [1,1,1,1,1,1,1,1],  # Bottom rim
-                [0,0,0,0,0,0,0,0]
-            ]
-            
             # Calculate how full bottom chamber should be based on time remaining
             # More time = more sand in top, less time = more sand in bottom
             max_time = 120  # 2 hours max for scale
@@ -355,48 +490,32 @@ def render_sense_hat_countdown():
             top_fill = int(time_ratio * 3)  # 0-3 rows of sand in top
             
             # Color based on urgency
-            if total_minutes < 10:
-                sand_color = (255, 50, 0)  # Bright red - urgent!
-                glow = int(pulse * 200)
-                outline_color = (255, glow, 0)
-            elif total_minutes < 30:
-                sand_color = (255, 150, 0)  # Orange
-                outline_color = (200, 150, 50)
-            else:
-                sand_color = (100, 200, 255)  # Blue - plenty of time
-                outline_color = (50, 100, 150)
+            band = bisect.bisect_right(URGENCY_BANDS, total_minutes)
+            sand_color = SAND_COLORS[band]
+            glow = int(pulse * 200)
+            scale, base = OUTLINE_COLORS[band]
+            outline_color = tuple(b + s * glow for s, b in zip(scale, base))
             
             # Draw hourglass outline
-            for y in range(8):
-                for x in range(8):
-                    if outline[y][x]:
-                        display.set_pixel(x, y, *outline_color)
+            pixels = [(0, 0, 0)] * 64
+            for index in HOURGLASS_OUTLINE:
+                pixels[index] = outline_color
             
-            # Draw sand in top chamber (rows 1-2)
-            if top_fill >= 1:
-                for x in range(2, 6):
-                    display.set_pixel(x, 1, *sand_color)
-            if top_fill >= 2:
-                for x in range(3, 5):
-                    display.set_pixel(x, 2, *sand_color)
+            # Draw sand in both chambers
+            for index in TOP_SAND_BY_FILL[top_fill] + BOTTOM_SAND_BY_FILL[bottom_fill]:
+                pixels[index] = sand_color
             
             # Draw sand falling through middle (animated)
             if int(time.time() * 2) % 2 == 0:
-                display.set_pixel(3, 3, *sand_color)
-                display.set_pixel(4, 3, *sand_color)
-            
-            # Draw sand in bottom chamber (rows 5-6)
-            bottom_rows = [
-                [(1,6), (2,6), (3,6), (4,6), (5,6), (6,6)],  # Bottom row
-                [(2,5), (3,5), (4,5), (5,5)],  # Second from bottom
-                [(2,5), (3,5), (4,5), (5,5)],  # Third from bottom
-                [(3,4), (4,4)]  # Fourth from bottom
-            ]
+                pixels[27] = sand_color
+                pixels[28] = sand_color
             
-            for i in range(min(bottom_fill, len(bottom_rows))):
-                for x, y in bottom_rows[i]:
-                    display.set_pixel(x, y, *sand_color)
+            display.set_pixels(pixels)
+        else:
+            display.clear()
     else:
+        display.clear()
+        
         # Checkmark - no schedules
         checkmark = [
             [0,0,0,0,0,0,0,0],
@@ -417,7 +536,6 @@ def render_sense_hat_countdown():
 def render_sense_hat_playing():
     """Screen 2: Music visualizer + progress bar when playing"""
     global display, playback_state
-    display.clear()
     
     if playback_state.get('playing'):
         import time
@@ -427,31 +545,23 @@ def render_sense_hat_playing():
         duration = playback_state.get('duration', 1)
         progress = min(1.0, position / duration) if duration > 0 else 0
         
-        # Top 6 rows: Animated visualizer bars
+        # Top 6 rows: Animated visualizer bars (pre-computed per phase)
         beat_time = time.time() * 4  # Animation speed
+        phase = int(beat_time * VISUALIZER_PHASES / (2 * math.pi)) % VISUALIZER_PHASES
         
-        for x in range(8):
-            # Each column bounces at different frequency
-            height = 3 + int(2 * abs(math.sin(beat_time + x * 0.7)))
-            
-            for y in range(6):
-                if y >= (6 - height):
-                    # Color gradient from bottom (green) to top (red)
-                    if y >= 4:
-                        display.set_pixel(x, y, 0, 200, 50)  # Green bottom
-                    elif y >= 2:
-                        display.set_pixel(x, y, 200, 200, 0)  # Yellow middle
-                    else:
-                        display.set_pixel(x, y, 255, 100, 0)  # Orange top
+        pixels = [(0, 0, 0)] * 64
+        for index, color in VISUALIZER_FRAMES[phase]:
+            pixels[index] = color
         
-        # Row 7 (bottom): Progress bar
+        # Row 7 (bottom): Progress bar - blue progress, dark gray remaining
         progress_pixels = int(progress * 8)
-        for x in range(8):
-            if x < progress_pixels:
-                display.set_pixel(x, 7, 0, 150, 255)  # Blue progress
-            else:
-                display.set_pixel(x, 7, 30, 30, 30)  # Dark gray remaining
+        pixels[56:] = [(0, 150, 255)] * progress_pixels + [(30, 30, 30)] * (8 - progress_pixels)
+        
+        # Write the whole frame at once
+        display.set_pixels(pixels)
     else:
+        display.clear()
+        
         # Not playing - show pause icon
         pause_icon = [
             [0,0,0,0,0,0,0,0],
@@ -480,7 +590,7 @@ def render_sense_hat_temperature():
         
         if temp:
             import time
-            pulse = int(abs(math.sin(time.time() * 2)) * 128) + 127
+            pulse = int(abs(fast_sin(time.time() * 2)) * 128) + 127
             
             # Heart shape
             heart = [
@@ -495,24 +605,8 @@ def render_sense_hat_temperature():
             ]
             
             # Temperature-based color
-            if temp < 16:
-                # Very cold - bright blue
-                heart_color = (0, 100, pulse)
-            elif temp < 18:
-                # Cold - light blue
-                heart_color = (0, pulse // 2, pulse)
-            elif temp < 22:
-                # Cool - cyan
-                heart_color = (0, pulse, pulse)
-            elif temp < 26:
-                # Comfortable - green/yellow
-                heart_color = (pulse // 2, pulse, 0)
-            elif temp < 28:
-                # Warm - orange
-                heart_color = (pulse, pulse // 2, 0)
-            else:
-                # Hot - red
-                heart_color = (pulse, 0, 0)
+            scale, base = HEART_COLORS[bisect.bisect_right(TEMP_BANDS, temp)]
+            heart_color = tuple(b + int(s * pulse) for s, b in zip(scale, base))
             
             # Draw pulsing heart
             for y in range(8):
@@ -571,7 +665,6 @@ def apply_brightness():
     if not display or not display_enabled:
         return
     
-    display_type = display_config.get('type', 'ssd1306')
     if display_type != 'sense_hat':
         return
     
@@ -653,6 +746,19 @@ def render_volume_overlay(volume_percent):
             display.set_pixel(7, y, 0, 255, 0)
 
 
+def joystick_loop():
+    """Joystick thread loop - blocks on the Sense HAT stick and queues events"""
+    while True:
+        try:
+            event = display.stick.wait_for_event(emptybuffer=False)
+            joystick_events.put(event)
+            display_wake.set()
+        except Exception as e:
+            # Usually a transient evdev read error; keep the stick working
+            print(f"Joystick error: {e}")
+            time.sleep(1)
+
+
 def handle_joystick_events():
     """Handle joystick input for brightness and volume control"""
     global display, current_brightness, showing_control_overlay, control_overlay_type
@@ -661,15 +767,15 @@ def handle_joystick_events():
     if not display or not display_enabled:
         return
     
-    display_type = display_config.get('type', 'ssd1306')
     if display_type != 'sense_hat':
         return
     
     try:
         from sense_hat import SenseHat, ACTION_PRESSED
         
-        # Check joystick events
-        for event in display.stick.get_events():
+        # Drain events queued by the joystick thread
+        while not joystick_events.empty():
+            event = joystick_events.get_nowait()
             if event.action == ACTION_PRESSED:
                 # UP/DOWN = Brightness control (8 levels: 1-8)
                 if event.direction == "up":
@@ -731,8 +837,6 @@ def update_display():
     if not display or not display_enabled:
         return
     
-    display_type = display_config.get('type', 'ssd1306')
-    
     try:
         # Check for joystick input
         handle_joystick_events()
@@ -762,11 +866,10 @@ def update_display():
             apply_brightness()
         
         elif display_type == 'ssd1306':
-            # Create image for OLED
-            width = display_config.get('width', 128)
-            height = display_config.get('height', 64)
-            image = Image.new('1', (width, height))
-            draw = ImageDraw.Draw(image)
+            # Reuse the OLED canvas, cleared for this frame
+            width, height = frame_image.size
+            frame_image.paste(0, (0, 0, width, height))
+            draw = ImageDraw.Draw(frame_image)
             
             # Render current screen (rotate through 4 screens)
             if current_screen == 0:
@@ -779,35 +882,55 @@ def update_display():
                 render_combined_screen(draw, width, height)
             
             # Display image
-            display.image(image)
-            display.show()
+            if display_config.get('direct_framebuffer', True):
+                write_framebuffer(frame_image)
+            else:
+                display.display(frame_image)
     except Exception as e:
         print(f"Display update error: {e}")
 
 
+def display_is_idle():
+    """Check whether nothing on screen changes between screen rotations"""
+    if playback_state.get('playing') or showing_control_overlay:
+        return False
+    
+    if display_type == 'sense_hat':
+        # Hourglass sand falls while a schedule is pending, and the
+        # temperature heart pulses while there is a reading
+        if current_screen == 0:
+            return get_next_schedule()[0] is None
+        if current_screen == 2:
+            return not (sensor_data_ref and sensor_data_ref.get('sensor_available')
+                        and sensor_data_ref.get('temperature'))
+        return True
+    
+    # Combined OLED screen shows a ticking clock
+    return current_screen != 3
+
+
 def display_loop():
     """Main display thread loop"""
     global current_screen, display_config
     
     rotation_interval = display_config.get('rotation_interval', 5)
-    update_interval = 1  # Update every second
-    rotation_counter = 0
     
     print(f"Starting display loop (rotating every {rotation_interval} seconds)...")
     
     while True:
         try:
+            # Screen follows the monotonic clock so rotation never drifts
+            current_screen = int(time.monotonic() // rotation_interval) % 4
             update_display()
-            rotation_counter += update_interval
-            
-            # Rotate screens
-            if rotation_counter >= rotation_interval:
-                current_screen = (current_screen + 1) % 4
-                rotation_counter = 0
         except Exception as e:
             print(f"Display loop error: {e}")
         
-        time.sleep(update_interval)
+        # Tick every second, or sleep until the next rotation when nothing
+        # animates; display_wake cuts the sleep short on state changes
+        step = rotation_interval if display_is_idle() else 1.0
+        deadline = (time.monotonic() // step + 1) * step
+        display_wake.wait(max(0, deadline - time.monotonic()))
+        display_wake.clear()
 
 
 def start_display_thread(schedules, sensor_data_dict):
@@ -839,12 +962,15 @@ def update_playback_state(playing=None, current_song=None, position=None, durati
         playback_state['position'] = position
     if duration is not None:
         playback_state['duration'] = duration
+    
+    display_wake.set()
 
 
 def update_schedules(schedules):
     """Update schedules data for display"""
     global schedules_data
     schedules_data = schedules
+    display_wake.set()
 
 
 def set_volume_callback(callback):
@@ -3,34 +3,51 @@ Flipper Zero Controller for HomePi Security System
 Uses PyFlipper library for reliable Flipper Zero control
 """
 
+import os
 import json
 import time
+import select
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# PyFlipper library
-pyflipper_available = False
-try:
-    from pyflipper import PyFlipper
-    pyflipper_available = True
-except ImportError as e:
-    print(f"⚠ PyFlipper module not available: {e}")
-    print(f"   Install with: pip install pyflipper")
+# PyFlipper library (imported by init_flipper() so startup without a
+# Flipper configured doesn't pay for pyflipper/pyserial)
+PyFlipper = None
 
 # Global Flipper state
 flipper = None
 flipper_config = {}
 flipper_enabled = False
-last_command_time = 0
+cooldown_until = 0.0  # time.monotonic() when the next garage command is allowed
+config_mtime = None  # mtime of config.json when flipper_config was loaded
+connection_checked = False  # Set once the Flipper has answered a command
+# Held while a garage press is in progress so overlapping triggers bail out
+garage_trigger_lock = threading.Lock()
+# Single worker thread that owns all serial I/O to the Flipper
+flipper_io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="FlipperIO")
+
+PROMPT = b'>:'  # Flipper CLI prompt printed after every command
+READ_CHUNK = 8192  # Response buffer size (grown in steps of this if needed)
+
+# Prebuilt CLI commands (send_command() sends bytes as-is, terminator included)
+CMD_PROMPT = b'\r'  # Empty line, just reprints the prompt
+CMD_DEVICE_INFO = b'device_info\r'
 
 
 def load_config():
     """Load Flipper configuration from config.json"""
-    global flipper_config
+    global flipper_config, config_mtime
     
     try:
+        # Only re-parse the file when it has changed
+        mtime = os.stat('config.json').st_mtime
+        if mtime == config_mtime and flipper_config:
+            return flipper_config
+        
         with open('config.json', 'r') as f:
             config = json.load(f)
             flipper_config = config.get('security', {}).get('automation', {})
+            config_mtime = mtime
             return flipper_config
     except Exception as e:
         print(f"Error loading Flipper config: {e}")
@@ -42,16 +59,37 @@ def load_config():
         }
 
 
-def init_flipper(port=None):
+def load_pyflipper():
+    """Import PyFlipper on first use; returns False if it is not installed"""
+    global PyFlipper
+    
+    if PyFlipper is None:
+        try:
+            from pyflipper import PyFlipper as pyflipper_class
+            PyFlipper = pyflipper_class
+        except ImportError as e:
+            print(f"⚠ PyFlipper module not available: {e}")
+            return False
+    return True
+
+
+def init_flipper(port=None, probe=False):
     """
     Initialize PyFlipper connection to Flipper Zero
     
+    By default the connection is validated lazily by the first command
+    sent or garage press; pass probe=True to check it (and print device
+    info) right away.
+    
     Args:
         port: Serial port (e.g., /dev/ttyACM0)
+        probe: Query the Flipper before returning
     """
-    global flipper, flipper_enabled, flipper_config
+    global flipper, flipper_enabled, flipper_config, connection_checked
     
-    if not pyflipper_available:
+    connection_checked = False
+    
+    if not load_pyflipper():
         print("PyFlipper module not available")
         print("Install with: pip install pyflipper")
         return False
@@ -65,9 +103,26 @@ def init_flipper(port=None):
         # Initialize PyFlipper
         flipper = PyFlipper(com=port)
         
+        # Ask the tty layer to hand over received bytes immediately instead
+        # of batching them (ASYNC_LOW_LATENCY); not every USB-CDC driver
+        # supports this, so it is best effort
+        try:
+            flipper._serial_wrapper._serial_port.set_low_latency_mode(True)
+        except (AttributeError, ValueError, OSError) as e:
+            print(f"  Note: low-latency serial mode not available: {e}")
+        
         flipper_enabled = True
         print(f"✓ Flipper Zero connected on {port}")
         
+        if not probe:
+            return True
+        
+        # Probe for the CLI prompt with short retries rather than letting
+        # device_info block on a Flipper that is still booting
+        if not wait_for_prompt():
+            print("  Warning: Flipper CLI not responding yet, but connection established")
+            return True
+        
         # Test connection by getting device info
         try:
             info = flipper.device_info.info()
@@ -84,6 +139,147 @@ def init_flipper(port=None):
         return False
 
 
+def _exchange(command, wait_response, timeout, flush_input):
+    """Write a CLI command and read its response (runs on the Flipper I/O thread)"""
+    try:
+        # PyFlipper keeps the pyserial port on its serial wrapper
+        port = flipper._serial_wrapper._serial_port
+        
+        if flush_input:
+            port.reset_input_buffer()
+        # Write straight to the fd: commands are short and the Flipper is a
+        # USB CDC-ACM device (no hardware flow control), so pyserial's write
+        # wrapper and tcdrain() buy nothing here
+        fd = port.fileno()
+        if isinstance(command, str):
+            command = f"{command}\r".encode('utf-8')
+        payload = memoryview(command)
+        written = 0
+        while written < len(payload):
+            written += os.write(fd, payload[written:])
+        
+        if not wait_response:
+            return b''
+        
+        # Block in select() until bytes arrive, then read whatever is there
+        # straight into a preallocated buffer (no FIONREAD, no concatenation)
+        response = bytearray(READ_CHUNK)
+        view = memoryview(response)
+        pos = 0
+        deadline = time.monotonic() + timeout
+        found = False
+        while not found:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if ready:
+                if pos == len(response):
+                    view.release()
+                    response.extend(bytes(READ_CHUNK))
+                    view = memoryview(response)
+                count = os.readv(fd, [view[pos:]])
+                if count == 0:
+                    break  # port closed
+                # Only scan the new bytes (plus a possible split prompt)
+                found = response.find(PROMPT, max(0, pos - len(PROMPT) + 1), pos + count) != -1
+                pos += count
+        
+        # Hand back a single copy; stripping/decoding happens in the caller's
+        # thread so the I/O thread can start on the next queued command
+        raw = bytes(view[:pos])
+        view.release()
+        return raw
+        
+    except Exception as e:
+        print(f"Error sending Flipper command: {e}")
+        return None
+
+
+def send_command_raw(command, wait_response=True, timeout=2, flush_input=False):
+    """
+    Send a CLI command to the Flipper Zero and return the undecoded output
+    
+    Commands are queued to the Flipper I/O thread, so callers never contend
+    for the serial port themselves.
+    
+    Args:
+        command: CLI command (e.g., 'device_info'), or prebuilt bytes
+            such as CMD_DEVICE_INFO that already end in '\r'
+        wait_response: Wait for the CLI prompt and return the output;
+            when False the command is queued and this returns immediately
+        timeout: Seconds to wait for the response
+        flush_input: Discard unread input first (use for the first command
+            of a sequence; chained commands keep pending bytes)
+    
+    Returns:
+        Command output as bytes (b'' when not waiting), or None on error
+    """
+    global flipper_enabled, connection_checked
+    
+    if not flipper_enabled:
+        print("Flipper not enabled")
+        return None
+    
+    # The first command doubles as the connection check, so don't let it
+    # hang for the full timeout on a dead port
+    if wait_response and not connection_checked:
+        timeout = min(timeout, 1)
+    
+    future = flipper_io.submit(_exchange, command, wait_response, timeout, flush_input)
+    if not wait_response:
+        return b''
+    response = future.result()
+    
+    if not connection_checked:
+        if response:
+            connection_checked = True
+        else:
+            print("Flipper Zero not responding, disabling")
+            flipper_enabled = False
+    return response
+
+
+def send_command(command, wait_response=True, timeout=2, flush_input=False):
+    """
+    Send a raw CLI command to the Flipper Zero
+    
+    Same as send_command_raw() but decodes the output; callers that only
+    look for a marker (the prompt, 'error') should use the raw bytes.
+    
+    Returns:
+        Command output ('' when not waiting), or None on error
+    """
+    response = send_command_raw(command, wait_response, timeout, flush_input)
+    if response is None:
+        return None
+    return response.decode('utf-8', errors='ignore').strip()
+
+
+def wait_for_prompt(attempts=20, interval=0.1):
+    """
+    Check that the Flipper CLI is answering
+    
+    Sends an empty line and waits briefly for the prompt, retrying so a
+    responsive Flipper is detected on the first try.
+    
+    Args:
+        attempts: Number of probes before giving up
+        interval: Seconds to wait for the prompt on each probe
+    
+    Returns:
+        True once the prompt is seen, False if it never appeared
+    """
+    global connection_checked
+    
+    for attempt in range(attempts):
+        response = flipper_io.submit(_exchange, CMD_PROMPT, True, interval, True).result()
+        if response and PROMPT in response:
+            connection_checked = True
+            return True
+    return False
+
+
 def open_garage():
     """
     Open garage door via Sub-GHz signal using PyFlipper
@@ -91,26 +287,40 @@ def open_garage():
     Requires Sub-GHz app to be open with garage.sub loaded.
     Uses PyFlipper's input.send() to press and hold OK button for 10 seconds.
     """
-    global last_command_time, flipper_config
+    global cooldown_until, flipper_config, flipper_enabled
     
     if not flipper_enabled:
         print("Flipper not enabled")
         return False
     
-    # Check cooldown
-    cooldown = flipper_config.get('cooldown_seconds', 300)
-    if time.time() - last_command_time < cooldown:
-        remaining = int(cooldown - (time.time() - last_command_time))
-        print(f"Garage command on cooldown ({remaining}s remaining)")
+    # The connection isn't probed at startup, so the first press checks it
+    if not connection_checked and not wait_for_prompt(attempts=5):
+        print("Flipper Zero not responding, disabling")
+        flipper_enabled = False
+        return False
+    
+    # The cooldown only starts once the ~11s press finishes, so a second
+    # detector firing meanwhile must not queue another press (toggle)
+    if not garage_trigger_lock.acquire(blocking=False):
+        print("Garage command already in progress")
         return False
     
     try:
+        # Check cooldown under the lock, so a caller can't pass it just
+        # before a finishing press sets it (monotonic, so clock changes
+        # can't shift it)
+        now = time.monotonic()
+        if now < cooldown_until:
+            remaining = int(cooldown_until - now)
+            print(f"Garage command on cooldown ({remaining}s remaining)")
+            return False
+        
         print("🚗 Opening garage door...")
         print("⚠ Make sure Sub-GHz app is open with garage.sub loaded!")
         
         # Press OK button
         print("Pressing OK button...")
-        flipper.input.send("ok", "press")
+        flipper_io.submit(flipper.input.send, "ok", "press").result()
         
         # Hold for 10 seconds (transmission duration)
         print("Transmitting signal... (10 seconds)")
@@ -118,17 +328,20 @@ def open_garage():
         
         # Release OK button
         print("Releasing OK button...")
-        flipper.input.send("ok", "release")
+        flipper_io.submit(flipper.input.send, "ok", "release").result()
         
         time.sleep(1)
         
         print("✓ Garage door command sent")
-        last_command_time = time.time()
+        cooldown = flipper_config.get('cooldown_seconds', 300)
+        cooldown_until = time.monotonic() + cooldown
         return True
         
     except Exception as e:
         print(f"Error opening garage: {e}")
         return False
+    finally:
+        garage_trigger_lock.release()
 
 
 def close_garage():
@@ -155,10 +368,9 @@ def is_enabled():
 
 def get_status():
     """Get Flipper connection status"""
-    global flipper, flipper_enabled, last_command_time, flipper_config
+    global flipper, flipper_enabled, flipper_config
     
     cooldown = flipper_config.get('cooldown_seconds', 300)
-    time_since_last = time.time() - last_command_time if last_command_time > 0 else cooldown
     
     return {
         'enabled': flipper_enabled,
@@ -166,7 +378,7 @@ def get_status():
         'port': flipper_config.get('flipper_port', '/dev/ttyACM0'),
         'auto_open': flipper_config.get('auto_open', True),
         'cooldown_seconds': cooldown,
-        'ready': time_since_last >= cooldown
+        'ready': time.monotonic() >= cooldown_until
     }
 
 
@@ -194,7 +406,7 @@ if __name__ == "__main__":
         print("Test cancelled")
         exit(0)
     
-    if init_flipper():
+    if init_flipper(probe=True):
         print("\n✓ Flipper Zero initialized successfully")
         print(f"Status: {get_status()}")
         
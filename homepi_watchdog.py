@@ -7,22 +7,85 @@ Monitors system health and automatically fixes common issues
 import os
 import sys
 import time
+import atexit
 import json
+import re
+import select
+import signal
+import errno
+import fcntl
+import socket
+import struct
 import subprocess
 import logging
+import threading
+import queue
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import requests
+from requests.adapters import HTTPAdapter
 import psutil
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
+from types import MappingProxyType
 
-def load_watchdog_config():
-    """Load watchdog configuration from JSON file"""
+# Optional: query systemd over D-Bus instead of spawning systemctl
+try:
+    from pystemd.dbuslib import DBus
+    from pystemd.systemd1 import Manager, Unit
+    pystemd_available = True
+except ImportError:
+    pystemd_available = False
+
+CONFIG_FILE = '/home/mujadded/homepi/watchdog_config.json'
+
+# Defaults for anything missing from the config file (or all of it if the
+# file can't be read)
+DEFAULT_CONFIG = {
+    'check_interval': 30,
+    'check_timeout': 60,
+    'max_failures': 3,
+    'service_name': 'homepi.service',
+    'app_port': 5000,
+    'app_url': 'http://localhost:5000',
+    'log_level': 'INFO',
+    'log_file': '/var/log/homepi-watchdog.log',
+    'max_log_size_mb': 10,
+    'max_log_files': 5,
+    'enable_service_restart': True,
+    'enable_network_fix': True,
+    'enable_camera_fix': True,
+    'enable_bluetooth_fix': True,
+    'enable_system_reboot': False,
+    'max_reboots_per_hour': 1,
+    'network_timeout': 10,
+    'bluetooth_devices': ['hci0'],
+    'critical_services': ['homepi.service', 'bluetooth.service'],
+    'network_interface': 'eth0',
+    'dns_servers': ['8.8.8.8', '1.1.1.1'],
+    'test_urls': ['http://192.168.0.26:5000/', 'http://google.com', 'http://cloudflare.com'],
+    'enable_external_test': True,
+    'test_endpoints': ['/api/security/status', '/api/security/live-feed'],
+    'fix_methods': ['service_restart', 'interface_restart', 'firewall_check'],
+    'test_timeout': 10
+}
+
+def load_watchdog_config(fallback=None):
+    """
+    Load watchdog configuration from JSON file
+    
+    Args:
+        fallback: Config to return if the file can't be read (defaults
+            are used when not given)
+    """
+    merged_config = dict(DEFAULT_CONFIG)
+    
     try:
-        with open('/home/mujadded/homepi/watchdog_config.json', 'r') as f:
+        with open(CONFIG_FILE, 'r') as f:
             config = json.load(f)
             
-        # Merge configuration sections
-        merged_config = {}
+        # Merge configuration sections over the defaults
         merged_config.update(config.get('watchdog', {}))
         merged_config.update(config.get('monitoring', {}))
         merged_config.update(config.get('auto_fix', {}))
@@ -31,75 +94,97 @@ def load_watchdog_config():
         merged_config.update(config.get('bluetooth', {}))
         merged_config.update(config.get('system', {}))
         
-        # Set defaults for missing values
-        defaults = {
-            'check_interval': 30,
-            'max_failures': 3,
-            'service_name': 'homepi.service',
-            'app_port': 5000,
-            'app_url': 'http://localhost:5000',
-            'log_file': '/var/log/homepi-watchdog.log',
-            'max_log_size_mb': 10,
-            'max_log_files': 5,
-            'enable_service_restart': True,
-            'enable_network_fix': True,
-            'enable_camera_fix': True,
-            'enable_bluetooth_fix': True,
-            'enable_system_reboot': False,
-            'max_reboots_per_hour': 1,
-            'network_timeout': 10,
-            'bluetooth_devices': ['hci0'],
-            'critical_services': ['homepi.service', 'bluetooth.service'],
-            'network_interface': 'eth0',
-            'dns_servers': ['8.8.8.8', '1.1.1.1'],
-            'test_urls': ['http://192.168.0.26:5000/', 'http://google.com', 'http://cloudflare.com'],
-            'enable_external_test': True,
-            'test_endpoints': ['/api/security/status', '/api/security/live-feed'],
-            'fix_methods': ['service_restart', 'interface_restart', 'firewall_check'],
-            'test_timeout': 10
-        }
-        
-        for key, default_value in defaults.items():
-            if key not in merged_config:
-                merged_config[key] = default_value
-        
-        # Convert log size to bytes
-        merged_config['max_log_size'] = merged_config.get('max_log_size_mb', 10) * 1024 * 1024
-        
-        return merged_config
-        
     except Exception as e:
         print(f"Error loading watchdog config: {e}")
-        # Return default config if file loading fails
-        return {
-            'check_interval': 30,
-            'max_failures': 3,
-            'service_name': 'homepi.service',
-            'app_port': 5000,
-            'app_url': 'http://localhost:5000',
-            'log_file': '/var/log/homepi-watchdog.log',
-            'max_log_size': 10 * 1024 * 1024,
-            'max_log_files': 5,
-            'enable_network_fix': True,
-            'enable_camera_fix': True,
-            'enable_bluetooth_fix': True,
-            'enable_service_restart': True,
-            'enable_system_reboot': False,
-            'max_reboots_per_hour': 1,
-            'network_timeout': 10,
-            'bluetooth_devices': ['hci0'],
-            'critical_services': ['homepi.service', 'bluetooth.service'],
-            'network_interface': 'eth0',
-            'dns_servers': ['8.8.8.8', '1.1.1.1'],
-            'test_urls': ['http://192.168.0.26:5000/', 'http://google.com', 'http://cloudflare.com'],
-            'enable_external_test': True,
-            'test_endpoints': ['/api/security/status', '/api/security/live-feed'],
-            'fix_methods': ['service_restart', 'interface_restart', 'firewall_check'],
-            'test_timeout': 10
-        }
+        if fallback is not None:
+            return fallback
+    
+    # Convert log size to bytes
+    merged_config['max_log_size'] = merged_config.get('max_log_size_mb', 10) * 1024 * 1024
+    
+    return merged_config
+
+# List settings only used for membership tests, stored as frozensets
+SET_KEYS = ('fix_methods',)
+
+def freeze_value(key, value):
+    """Make a config value immutable (lists become tuples, or frozensets for SET_KEYS)"""
+    if isinstance(value, list):
+        return frozenset(value) if key in SET_KEYS else tuple(value)
+    return value
+
+WATCHDOG_CONFIG = None
+config_mtime = None  # mtime of CONFIG_FILE when WATCHDOG_CONFIG was loaded
+
+def get_config():
+    """
+    Return WATCHDOG_CONFIG, reloading it first if the JSON file changed
+    
+    The config is read-only (see freeze_value()); a file that fails to parse keeps the previous config.
+    """
+    global WATCHDOG_CONFIG, config_mtime
+    
+    try:
+        mtime = os.stat(CONFIG_FILE).st_mtime
+    except OSError:
+        mtime = None
+    
+    if WATCHDOG_CONFIG is None or mtime != config_mtime:
+        previous = WATCHDOG_CONFIG
+        config = load_watchdog_config(fallback=previous)
+        WATCHDOG_CONFIG = MappingProxyType({
+            key: freeze_value(key, value) for key, value in config.items()
+        })
+        config_mtime = mtime
+        if previous is not None and config is not previous:
+            print("Watchdog config reloaded")
+    
+    return WATCHDOG_CONFIG
 
 # Load configuration
-WATCHDOG_CONFIG = load_watchdog_config()
+get_config()
+
+# Persistent state (systemd StateDirectory; /tmp is private and wiped on boot)
+STATE_DIR = '/var/lib/homepi-watchdog'
+# Written before a watchdog-initiated reboot so the next start runs post-reboot fixes
+REBOOT_FLAG_FILE = os.path.join(STATE_DIR, 'reboot-flag')
+# Reboot rate-limit window, kept across the reboots it limits
+REBOOT_STATE_FILE = os.path.join(STATE_DIR, 'reboot-state.json')
+
+# HTTP probes give up on an unreachable host after this many seconds
+# (network_timeout still bounds the wait for a response)
+CONNECT_TIMEOUT = 2
+
+# Unit changes arriving this many seconds after the watchdog itself stopped
+# or restarted a unit are still treated as its own doing
+UNIT_CHANGE_GRACE = 5
+
+# HCIGETDEVINFO ioctl (what hciconfig uses): fills a 92-byte struct
+# hci_dev_info whose u32 flags field sits at offset 16; bit 0 is HCI_UP
+HCIGETDEVINFO = 0x800448D3
+HCI_DEV_INFO_SIZE = 92
+HCI_FLAGS_OFFSET = 16
+HCI_UP = 0x1
+
+# One 'pactl list short sinks' line for a Bluetooth sink:
+# index, name, module, sample spec, state -> captures (name, state)
+BLUEZ_SINK_RE = re.compile(r'^\d+[ \t]+(\S*bluez\S*)[ \t].*[ \t](\S+)[ \t]*$', re.M)
+
+# pactl has to run as the desktop user against their PulseAudio/PipeWire socket;
+# subprocess drops to that uid itself, so there's no sudo/env process in between
+PACTL = ['pactl']
+PACTL_UID = 1000
+PACTL_RUN_AS = {
+    'user': PACTL_UID,
+    'group': PACTL_UID,
+    'extra_groups': [],
+    'env': {
+        **os.environ,
+        'HOME': '/home/mujadded',
+        'XDG_RUNTIME_DIR': f'/run/user/{PACTL_UID}',
+        'PULSE_RUNTIME_PATH': f'/run/user/{PACTL_UID}/pulse',
+    },
+}
 
 class HomePiWatchdog:
     def __init__(self):
@@ -108,6 +193,47 @@ class HomePiWatchdog:
         self.last_reboot = None
         self.reboot_count = 0
         self.reboot_window_start = None
+        self.load_reboot_state()
+        # Health checks are I/O bound, so run them side by side
+        self.check_pool = ThreadPoolExecutor(max_workers=6, thread_name_prefix="HealthCheck")
+        # Last submitted future per check; one that timed out keeps running,
+        # so it isn't submitted again until it has finished
+        self.check_futures = {}
+        # Network and camera probes run at the same time, so room for both
+        probe_count = len(WATCHDOG_CONFIG['test_urls']) + len(WATCHDOG_CONFIG.get('test_endpoints', ()))
+        self.probe_pool = ThreadPoolExecutor(max_workers=probe_count or 1, thread_name_prefix="NetProbe")
+        # Runs fix_bluetooth() next to the (sequential) service/network fixes
+        self.fix_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="BluetoothFix")
+        # Keep-alive connections shared by every HTTP probe
+        self.http = requests.Session()
+        self.http.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0))
+        self.http.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0))
+        # Prime psutil so later cpu_percent(interval=None) calls report usage
+        # since the previous call without blocking
+        psutil.cpu_percent(interval=None)
+        self.cpu_percent = 0.0
+        self.cpu_sampled_at = 0.0
+        self.disk_percent = None
+        self.disk_checked_at = 0.0
+        # Camera URLs built from the device IP (see check_camera_connectivity)
+        self.camera_endpoints = None
+        self.camera_endpoints_at = 0.0
+        self.camera_endpoints_config = None
+        # TCP-only app checks since the last full HTTP one (start with HTTP)
+        self.app_fast_checks = 4
+        # Loaded pystemd units by name; sd-bus connections aren't thread safe
+        self.units = {}
+        self.units_lock = threading.Lock()
+        # The flag file only ever goes away during this process's lifetime,
+        # so check it once instead of on every Bluetooth fix
+        self.is_post_reboot = os.path.exists(REBOOT_FLAG_FILE)
+        # Set to run the next cycle early (e.g. a critical unit went down)
+        self.wake = threading.Event()
+        # Unit changes before this time.monotonic() are the watchdog's own;
+        # fixes can run in parallel, so own_unit_changes() blocks nest
+        self.own_unit_changes_until = 0.0
+        self.own_unit_changes_depth = 0
+        self.own_unit_changes_lock = threading.Lock()
         self.logger.info("HomePi Watchdog Service Started")
         
     def setup_logging(self):
@@ -115,175 +241,345 @@ class HomePiWatchdog:
         log_dir = Path(WATCHDOG_CONFIG['log_file']).parent
         log_dir.mkdir(parents=True, exist_ok=True)
         
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(WATCHDOG_CONFIG['log_file']),
-                logging.StreamHandler(sys.stdout)
-            ]
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        file_handler = RotatingFileHandler(
+            WATCHDOG_CONFIG['log_file'],
+            maxBytes=WATCHDOG_CONFIG['max_log_size'],
+            backupCount=WATCHDOG_CONFIG['max_log_files']
         )
+        file_handler.setFormatter(formatter)
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(formatter)
+        
+        # Checks only enqueue records; a background thread does the writes
+        # (and rotation) so a slow SD card never stalls a check
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        self.log_listener = QueueListener(log_queue, file_handler, stream_handler)
+        self.log_listener.start()
+        # atexit runs after the interpreter has joined the pool workers, so
+        # whatever they log on the way out is written too
+        atexit.register(self.log_listener.stop)
+        
+        log_level = getattr(logging, str(WATCHDOG_CONFIG['log_level']).upper(), logging.INFO)
+        logging.basicConfig(level=log_level, handlers=[queue_handler])
         self.logger = logging.getLogger(__name__)
         
-    def log_rotate(self):
-        """Rotate log files if they get too large"""
-        log_file = Path(WATCHDOG_CONFIG['log_file'])
-        if log_file.exists() and log_file.stat().st_size > WATCHDOG_CONFIG['max_log_size']:
-            # Rotate existing logs
-            for i in range(WATCHDOG_CONFIG['max_log_files'] - 1, 0, -1):
-                old_log = f"{WATCHDOG_CONFIG['log_file']}.{i}"
-                new_log = f"{WATCHDOG_CONFIG['log_file']}.{i + 1}"
-                if Path(old_log).exists():
-                    Path(old_log).rename(new_log)
-            
-            # Move current log
-            log_file.rename(f"{WATCHDOG_CONFIG['log_file']}.1")
-            
-            # Recreate log file
-            log_file.touch()
-            self.logger.info("Log rotated")
-    
-    def run_command(self, command, timeout=30):
-        """Run a shell command with timeout"""
+    def flush_logs(self):
+        """Write out every queued log record (before a reboot, say)"""
+        # stop() drains the queue before returning; start again so later
+        # records are still written if the process lives on
+        self.log_listener.stop()
+        self.log_listener.start()
+    
+    def handle_sigterm(self, signum, frame):
+        """Exit on SIGTERM (systemctl stop, shutdown) without losing queued logs"""
+        self.logger.info("Watchdog service stopped by SIGTERM")
+        # Don't start queued checks or fixes; running ones finish before the
+        # interpreter exits, and the log listener is stopped after them
+        for pool in (self.check_pool, self.probe_pool, self.fix_pool):
+            pool.shutdown(wait=False, cancel_futures=True)
+        sys.exit(0)
+        
+    def run_command(self, command, timeout=30, **kwargs):
+        """
+        Run a command with timeout
+        
+        The command is an argv list executed directly (no shell), so each
+        call costs one fork/exec; pipelines are done in Python by the caller.
+        Extra keyword arguments (env, user, ...) are passed to subprocess.run.
+        """
         try:
             result = subprocess.run(
                 command, 
-                shell=True, 
                 capture_output=True, 
                 text=True, 
-                timeout=timeout
+                timeout=timeout,
+                **kwargs
             )
             return result.returncode == 0, result.stdout, result.stderr
         except subprocess.TimeoutExpired:
-            self.logger.error(f"Command timed out: {command}")
+            self.logger.error(f"Command timed out: {' '.join(command)}")
             return False, "", "Command timed out"
         except Exception as e:
-            self.logger.error(f"Command failed: {command}, Error: {e}")
+            self.logger.error(f"Command failed: {' '.join(command)}, Error: {e}")
             return False, "", str(e)
     
-    def check_service_status(self):
+    def get_unit_state(self, name):
+        """
+        Get a systemd unit's ActiveState
+        
+        Reads the property over D-Bus when pystemd is installed, otherwise
+        (or if D-Bus fails) falls back to 'systemctl is-active'.
+        
+        Returns:
+            (is_active, state) where state is e.g. 'active' or 'failed'
+        """
+        if pystemd_available:
+            try:
+                with self.units_lock:
+                    unit = self.units.get(name)
+                    if unit is None:
+                        unit = Unit(name.encode(), _autoload=True)
+                        self.units[name] = unit
+                    state = unit.Unit.ActiveState.decode()
+                return state == 'active', state
+            except Exception as e:
+                self.logger.debug(f"D-Bus query for {name} failed, using systemctl: {e}")
+                self.units.pop(name, None)
+        
+        success, stdout, stderr = self.run_command(['systemctl', 'is-active', name])
+        state = stdout.strip() or stderr.strip()
+        return success and state == 'active', state
+    
+    def check_service_status(self, quiet=False):
         """Check if homepi service is running"""
         try:
-            success, stdout, stderr = self.run_command(f"systemctl is-active {WATCHDOG_CONFIG['service_name']}")
-            if success and stdout.strip() == 'active':
+            active, state = self.get_unit_state(WATCHDOG_CONFIG['service_name'])
+            if active:
                 return True
             else:
-                self.logger.warning(f"Service {WATCHDOG_CONFIG['service_name']} is not active: {stderr}")
+                self.check_warning(f"Service {WATCHDOG_CONFIG['service_name']} is not active: {state}", quiet)
                 return False
         except Exception as e:
             self.logger.error(f"Error checking service status: {e}")
             return False
     
-    def check_app_health(self):
+    def check_app_health(self, quiet=False):
         """Check if the Flask app is responding"""
+        # Between full /api/health requests (which run through Flask) just
+        # confirm the app's port accepts connections
+        if self.app_fast_checks < 4:
+            try:
+                socket.create_connection(
+                    ('127.0.0.1', WATCHDOG_CONFIG['app_port']),
+                    timeout=WATCHDOG_CONFIG['network_timeout']
+                ).close()
+                self.app_fast_checks += 1
+                return True
+            except OSError as e:
+                self.check_warning(f"App health check failed: {e}", quiet)
+                self.app_fast_checks = 4  # Confirm recovery with a full check
+                return False
+        
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{WATCHDOG_CONFIG['app_url']}/api/health", 
-                timeout=WATCHDOG_CONFIG['network_timeout']
+                timeout=(CONNECT_TIMEOUT, WATCHDOG_CONFIG['network_timeout'])
             )
             if response.status_code == 200:
+                self.app_fast_checks = 0
                 return True
             else:
-                self.logger.warning(f"App health check failed: HTTP {response.status_code}")
+                self.check_warning(f"App health check failed: HTTP {response.status_code}", quiet)
                 return False
         except requests.exceptions.RequestException as e:
-            self.logger.warning(f"App health check failed: {e}")
+            self.check_warning(f"App health check failed: {e}", quiet)
             return False
     
-    def check_network_connectivity(self):
-        """Check network connectivity"""
-        for url in WATCHDOG_CONFIG['test_urls']:
-            try:
-                response = requests.get(url, timeout=WATCHDOG_CONFIG['network_timeout'])
-                if response.status_code == 200:
+    def probe_url(self, url, deadline):
+        """
+        Return True if url answers with HTTP 200 before deadline
+        
+        Args:
+            url: URL to probe
+            deadline: time.monotonic() by which the probe gives up, covering
+                the HEAD and any GET fallback together
+        """
+        def timeout():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.Timeout(f"{url} probe deadline passed")
+            return (min(CONNECT_TIMEOUT, remaining), remaining)
+        
+        try:
+            # HEAD is enough to prove reachability without downloading
+            # the page; fall back to a bodiless GET if HEAD isn't allowed
+            response = self.http.head(url, timeout=timeout(), allow_redirects=True)
+            if response.status_code == 405:
+                response = self.http.get(url, timeout=timeout(), stream=True)
+                response.close()
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+    
+    def check_network_connectivity(self, deadline=None, quiet=False):
+        """
+        Check network connectivity
+        
+        Args:
+            deadline: Optional time.monotonic() to give up by, if sooner than
+                one probe's budget from now
+            quiet: Log a failure at debug instead of warning (see check_warning())
+        """
+        # Probe every URL at once and take the first success, so one hung
+        # host costs at most one probe's budget rather than delaying the
+        # rest. The probes stop at the same deadline they are waited for,
+        # so none outlive this check and hold up the next one
+        now = time.monotonic()
+        budget_at = now + 2 * (CONNECT_TIMEOUT + WATCHDOG_CONFIG['network_timeout'])
+        deadline = budget_at if deadline is None else min(deadline, budget_at)
+        futures = [self.probe_pool.submit(self.probe_url, url, deadline) for url in WATCHDOG_CONFIG['test_urls']]
+        try:
+            for future in as_completed(futures, timeout=max(0, deadline - now)):
+                if future.result():
+                    for pending in futures:
+                        pending.cancel()
                     return True
-            except requests.exceptions.RequestException:
-                continue
+        except FutureTimeout:
+            pass
         
-        self.logger.warning("Network connectivity check failed")
+        self.check_warning("Network connectivity check failed", quiet)
         return False
     
-    def check_camera_connectivity(self):
-        """Check camera connectivity from external sources"""
+    def get_default_interface(self):
+        """Return the interface carrying the default route (e.g. wlan0), or None"""
+        try:
+            with open('/proc/net/route') as f:
+                next(f)  # Header
+                for line in f:
+                    fields = line.split()
+                    # Destination 0.0.0.0 with the RTF_UP flag set
+                    if fields[1] == '00000000' and int(fields[3], 16) & 0x1:
+                        return fields[0]
+        except (OSError, StopIteration, IndexError, ValueError) as e:
+            self.logger.debug(f"Could not read routing table: {e}")
+        return None
+    
+    def get_device_ip(self):
+        """
+        Return the device's LAN IPv4 address, or None
+        
+        Prefers the default-route interface; otherwise the first non-loopback
+        address, like 'hostname -I'.
+        """
+        addresses = psutil.net_if_addrs()
+        interface = self.get_default_interface()
+        candidates = [interface] if interface in addresses else []
+        candidates += [name for name in addresses if name not in candidates]
+        
+        for name in candidates:
+            for addr in addresses[name]:
+                if addr.family == socket.AF_INET and not addr.address.startswith('127.'):
+                    return addr.address
+        return None
+    
+    def check_camera_connectivity(self, deadline=None, quiet=False):
+        """
+        Check camera connectivity from external sources
+        
+        Args:
+            deadline: Optional time.monotonic() to give up by, if sooner than
+                one probe's budget from now
+            quiet: Log a failure at debug instead of warning (see check_warning())
+        """
         if not WATCHDOG_CONFIG.get('enable_external_test', True):
             return True
             
         try:
-            # Get the device's external IP address
-            success, stdout, stderr = self.run_command("hostname -I | awk '{print $1}'")
-            if not success or not stdout.strip():
-                self.logger.warning("Could not determine device IP address")
-                return False
-            
-            device_ip = stdout.strip()
-            self.logger.debug(f"Device IP: {device_ip}")
-            
-            # Test camera endpoints from external perspective
-            test_endpoints = WATCHDOG_CONFIG.get('test_endpoints', ['/api/security/status', '/api/security/live-feed'])
-            camera_endpoints = [
-                f"http://{device_ip}:{WATCHDOG_CONFIG['app_port']}{endpoint}"
-                for endpoint in test_endpoints
-            ]
+            # The device IP rarely changes, so build the endpoint URLs at most
+            # every 5 minutes (or after a config reload / network fix)
+            now = time.monotonic()
+            if (self.camera_endpoints is None or now - self.camera_endpoints_at > 300
+                    or self.camera_endpoints_config is not WATCHDOG_CONFIG):
+                # Get the device's external IP address
+                device_ip = self.get_device_ip()
+                if not device_ip:
+                    self.check_warning("Could not determine device IP address", quiet)
+                    return False
+                
+                self.logger.debug(f"Device IP: {device_ip}")
+                
+                # Test camera endpoints from external perspective
+                test_endpoints = WATCHDOG_CONFIG.get('test_endpoints', ['/api/security/status', '/api/security/live-feed'])
+                self.camera_endpoints = [
+                    f"http://{device_ip}:{WATCHDOG_CONFIG['app_port']}{endpoint}"
+                    for endpoint in test_endpoints
+                ]
+                self.camera_endpoints_at = now
+                self.camera_endpoints_config = WATCHDOG_CONFIG
+            camera_endpoints = self.camera_endpoints
             
             timeout = WATCHDOG_CONFIG.get('test_timeout', WATCHDOG_CONFIG['network_timeout'])
             
-            for endpoint in camera_endpoints:
-                try:
-                    self.logger.debug(f"Testing camera endpoint: {endpoint}")
-                    response = requests.get(endpoint, timeout=timeout)
-                    if response.status_code == 200:
-                        self.logger.debug(f"Camera endpoint {endpoint} responded successfully")
+            # Try all endpoints at once and take the first that answers. As
+            # with the network probes, they stop at the deadline they are
+            # waited for, so a slow but healthy endpoint still passes and
+            # none outlive this check
+            now = time.monotonic()
+            budget_at = now + CONNECT_TIMEOUT + timeout
+            deadline = budget_at if deadline is None else min(deadline, budget_at)
+            futures = [self.probe_pool.submit(self.probe_camera_endpoint, endpoint, deadline) for endpoint in camera_endpoints]
+            try:
+                for future in as_completed(futures, timeout=max(0, deadline - now)):
+                    if future.result():
+                        for pending in futures:
+                            pending.cancel()
                         return True
-                except requests.exceptions.RequestException as e:
-                    self.logger.debug(f"Camera endpoint {endpoint} failed: {e}")
-                    continue
+            except FutureTimeout:
+                pass
             
-            self.logger.warning("Camera connectivity check failed - external access not working")
+            self.check_warning("Camera connectivity check failed - external access not working", quiet)
             return False
             
         except Exception as e:
             self.logger.error(f"Error checking camera connectivity: {e}")
             return False
     
-    def check_bluetooth_status(self):
+    def probe_camera_endpoint(self, endpoint, deadline):
+        """
+        Return True if a camera endpoint answers with HTTP 200 before deadline
+        
+        Args:
+            endpoint: Camera endpoint URL
+            deadline: time.monotonic() by which the probe gives up
+        """
+        try:
+            self.logger.debug(f"Testing camera endpoint: {endpoint}")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.Timeout(f"{endpoint} probe deadline passed")
+            # Only the status matters; live-feed is an endless MJPEG stream,
+            # so never read the body
+            response = self.http.get(endpoint, timeout=(min(CONNECT_TIMEOUT, remaining), remaining), stream=True)
+            response.close()
+            if response.status_code == 200:
+                self.logger.debug(f"Camera endpoint {endpoint} responded successfully")
+                return True
+        except requests.exceptions.RequestException as e:
+            self.logger.debug(f"Camera endpoint {endpoint} failed: {e}")
+        return False
+    
+    def check_bluetooth_status(self, quiet=False):
         """Check Bluetooth status"""
         if not WATCHDOG_CONFIG['enable_bluetooth_fix']:
             return True
             
         try:
             # Check Bluetooth service
-            success, stdout, stderr = self.run_command("systemctl is-active bluetooth")
-            self.logger.debug(f"Bluetooth service check: success={success}, stdout='{stdout.strip()}', stderr='{stderr.strip()}'")
-            if not success or stdout.strip() != 'active':
-                self.logger.warning("Bluetooth service is not active")
+            active, state = self.get_unit_state('bluetooth.service')
+            self.logger.debug(f"Bluetooth service check: active={active}, state='{state}'")
+            if not active:
+                self.check_warning("Bluetooth service is not active", quiet)
                 return False
             
             # Check if Bluetooth devices are available
             for device in WATCHDOG_CONFIG['bluetooth_devices']:
-                success, stdout, stderr = self.run_command(f"hciconfig {device}")
-                self.logger.debug(f"HCI device {device} check: success={success}, stdout='{stdout.strip()}', stderr='{stderr.strip()}'")
-                if not success or 'UP' not in stdout:
-                    self.logger.warning(f"Bluetooth device {device} is not up")
+                if not self.is_hci_device_up(device):
+                    self.check_warning(f"Bluetooth device {device} is not up", quiet)
                     return False
             
             # Check if Bluetooth audio sink is available (run as user)
-            cmd = "sudo -u mujadded bash -c 'export PULSE_RUNTIME_PATH=/run/user/1000/pulse && pactl list short sinks | grep bluez'"
-            success, stdout, stderr = self.run_command(cmd)
-            self.logger.debug(f"Bluetooth sink check command: {cmd}")
-            self.logger.debug(f"Bluetooth sink check: success={success}, stdout='{stdout.strip()}', stderr='{stderr.strip()}'")
-            
-            if not success or not stdout.strip():
-                self.logger.warning("No Bluetooth audio sink found")
+            bluez_sinks = self.get_bluetooth_sinks()
+            if not bluez_sinks:
+                self.check_warning("No Bluetooth audio sink found", quiet)
                 return False
             
             # Check if the sink is actually running (not suspended)
-            cmd = "sudo -u mujadded bash -c 'export PULSE_RUNTIME_PATH=/run/user/1000/pulse && pactl list short sinks | grep bluez | grep RUNNING'"
-            success, stdout, stderr = self.run_command(cmd)
-            self.logger.debug(f"Bluetooth running check command: {cmd}")
-            self.logger.debug(f"Bluetooth running check: success={success}, stdout='{stdout.strip()}', stderr='{stderr.strip()}'")
-            
-            if not success or not stdout.strip():
-                self.logger.warning("Bluetooth audio sink found but not running")
+            running_sinks = [name for name, state in bluez_sinks if state == 'RUNNING']
+            if not running_sinks:
+                self.check_warning("Bluetooth audio sink found but not running", quiet)
                 return False
             
             self.logger.info("Bluetooth status check passed - sink is running")
@@ -292,25 +588,90 @@ class HomePiWatchdog:
             self.logger.error(f"Error checking Bluetooth status: {e}")
             return False
     
-    def check_system_resources(self):
+    def is_hci_device_up(self, device):
+        """
+        Check whether an HCI adapter (e.g. hci0) is up
+        
+        Asks the kernel directly over an HCI socket instead of spawning
+        hciconfig; falls back to hciconfig if Python lacks Bluetooth sockets.
+        """
+        try:
+            dev_info = bytearray(HCI_DEV_INFO_SIZE)
+            struct.pack_into('H', dev_info, 0, int(device[3:]))
+            with socket.socket(socket.AF_BLUETOOTH, socket.SOCK_RAW, socket.BTPROTO_HCI) as hci:
+                fcntl.ioctl(hci.fileno(), HCIGETDEVINFO, dev_info)
+            flags = struct.unpack_from('I', dev_info, HCI_FLAGS_OFFSET)[0]
+            self.logger.debug(f"HCI device {device} flags: {flags:#x}")
+            return bool(flags & HCI_UP)
+        except OSError as e:
+            if e.errno == errno.ENODEV:
+                self.logger.debug(f"HCI device {device} not present")
+                return False
+        except (AttributeError, ValueError):
+            pass
+        
+        success, stdout, stderr = self.run_command(['hciconfig', device])
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"HCI device {device} check: success={success}, stdout='{stdout.strip()}', stderr='{stderr.strip()}'")
+        return success and 'UP' in stdout
+    
+    def get_bluetooth_sinks(self):
+        """
+        List Bluetooth audio sinks with a single pactl call
+        
+        Returns:
+            List of (sink name, state) tuples for bluez sinks, e.g.
+            ('bluez_output.41_42_9F_04_78_F1.1', 'RUNNING'); empty on failure
+        """
+        cmd = PACTL + ['list', 'short', 'sinks']
+        success, stdout, stderr = self.run_command(cmd, **PACTL_RUN_AS)
+        bluez_sinks = BLUEZ_SINK_RE.findall(stdout)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Bluetooth sink check command: {' '.join(cmd)}")
+            self.logger.debug(f"Bluetooth sink check: success={success}, sinks={bluez_sinks}, stderr='{stderr.strip()}'")
+        
+        if not success:
+            return []
+        return bluez_sinks
+    
+    def check_system_resources(self, quiet=False):
         """Check system resources (CPU, memory, disk)"""
         try:
-            # Check CPU usage
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # Check CPU usage (average since the last sample, rate limited so
+            # back-to-back checks don't read a meaningless tiny window)
+            now = time.monotonic()
+            if now - self.cpu_sampled_at >= 2.0:
+                self.cpu_percent = psutil.cpu_percent(interval=None)
+                self.cpu_sampled_at = now
+            cpu_percent = self.cpu_percent
             if cpu_percent > 90:
-                self.logger.warning(f"High CPU usage: {cpu_percent}%")
+                self.check_warning(f"High CPU usage: {cpu_percent}%", quiet)
                 return False
             
-            # Check memory usage
-            memory = psutil.virtual_memory()
-            if memory.percent > 90:
-                self.logger.warning(f"High memory usage: {memory.percent}%")
+            # Check memory usage (same formula as psutil, but only the two
+            # meminfo fields we need)
+            meminfo = {}
+            with open('/proc/meminfo') as f:
+                for line in f:
+                    key, value = line.split(':', 1)
+                    if key in ('MemTotal', 'MemAvailable'):
+                        meminfo[key] = int(value.split()[0])
+                        if len(meminfo) == 2:
+                            break
+            memory_percent = round(100 * (meminfo['MemTotal'] - meminfo['MemAvailable']) / meminfo['MemTotal'], 1)
+            if memory_percent > 90:
+                self.check_warning(f"High memory usage: {memory_percent}%", quiet)
                 return False
             
-            # Check disk usage
-            disk = psutil.disk_usage('/')
-            if disk.percent > 90:
-                self.logger.warning(f"High disk usage: {disk.percent}%")
+            # Check disk usage (changes slowly, so only stat it every 5 minutes)
+            if self.disk_percent is None or now - self.disk_checked_at > 300:
+                st = os.statvfs('/')
+                used = (st.f_blocks - st.f_bfree) * st.f_frsize
+                free = st.f_bavail * st.f_frsize
+                self.disk_percent = round(100 * used / (used + free), 1)
+                self.disk_checked_at = now
+            if self.disk_percent > 90:
+                self.check_warning(f"High disk usage: {self.disk_percent}%", quiet)
                 return False
             
             return True
@@ -318,6 +679,21 @@ class HomePiWatchdog:
             self.logger.error(f"Error checking system resources: {e}")
             return False
     
+    @contextmanager
+    def own_unit_changes(self):
+        """Keep unit changes caused inside the with block from waking the main loop"""
+        with self.own_unit_changes_lock:
+            self.own_unit_changes_depth += 1
+            self.own_unit_changes_until = float('inf')
+        try:
+            yield
+        finally:
+            # The grace period starts when the last concurrent fix is done
+            with self.own_unit_changes_lock:
+                self.own_unit_changes_depth -= 1
+                if self.own_unit_changes_depth == 0:
+                    self.own_unit_changes_until = time.monotonic() + UNIT_CHANGE_GRACE
+    
     def restart_service(self):
         """Restart the homepi service"""
         if not WATCHDOG_CONFIG['enable_service_restart']:
@@ -325,12 +701,13 @@ class HomePiWatchdog:
             
         self.logger.info("Restarting homepi service...")
         try:
-            # Stop service
-            self.run_command(f"systemctl stop {WATCHDOG_CONFIG['service_name']}")
-            time.sleep(5)
-            
-            # Start service
-            success, stdout, stderr = self.run_command(f"systemctl start {WATCHDOG_CONFIG['service_name']}")
+            with self.own_unit_changes():
+                # Stop service
+                self.run_command(['systemctl', 'stop', WATCHDOG_CONFIG['service_name']])
+                self.wait_until(lambda: not self.get_unit_state(WATCHDOG_CONFIG['service_name'])[0], 5, interval=0.2)
+                
+                # Start service
+                success, stdout, stderr = self.run_command(['systemctl', 'start', WATCHDOG_CONFIG['service_name']])
             if success:
                 self.logger.info("Service restarted successfully")
                 return True
@@ -341,30 +718,50 @@ class HomePiWatchdog:
             self.logger.error(f"Error restarting service: {e}")
             return False
     
+    def wait_until(self, predicate, timeout, interval=1.0):
+        """
+        Poll predicate until it returns True or timeout seconds pass
+        
+        Used instead of fixed sleeps after a fix so a quick recovery is
+        noticed right away.
+        
+        Returns:
+            True if the predicate passed, False on timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if predicate():
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+    
     def fix_network(self):
         """Fix network connectivity issues"""
         if not WATCHDOG_CONFIG['enable_network_fix']:
             return False
             
         self.logger.info("Attempting to fix network connectivity...")
+        self.camera_endpoints = None  # The IP may change
         
         try:
             # Restart networking service
-            self.run_command("systemctl restart networking")
+            self.run_command(['systemctl', 'restart', 'networking'])
             time.sleep(10)
             
             # Restart network interface
             interface = WATCHDOG_CONFIG['network_interface']
-            self.run_command(f"ifdown {interface}")
+            self.run_command(['ifdown', interface])
             time.sleep(2)
-            self.run_command(f"ifup {interface}")
-            time.sleep(10)
+            self.run_command(['ifup', interface])
             
             # Flush DNS cache
-            self.run_command("systemctl flush-dns")
+            self.run_command(['systemctl', 'flush-dns'])
             
-            # Test connectivity
-            if self.check_network_connectivity():
+            # Test connectivity (give the interface up to 10s to come back)
+            recheck_deadline = time.monotonic() + 10
+            if self.wait_until(lambda: self.check_network_connectivity(deadline=recheck_deadline, quiet=True), 10):
                 self.logger.info("Network connectivity restored")
                 return True
             else:
@@ -375,28 +772,32 @@ class HomePiWatchdog:
             self.logger.error(f"Error fixing network: {e}")
             return False
     
+    def camera_recovered(self, timeout):
+        """Poll the camera check quietly for up to timeout seconds after a fix"""
+        recheck_deadline = time.monotonic() + timeout
+        return self.wait_until(lambda: self.check_camera_connectivity(deadline=recheck_deadline, quiet=True), timeout)
+    
     def fix_camera_connectivity(self):
         """Fix camera connectivity issues"""
         if not WATCHDOG_CONFIG.get('enable_camera_fix', True):
             return False
             
         self.logger.info("Attempting to fix camera connectivity...")
+        self.camera_endpoints = None  # The IP may change
         
         try:
-            fix_methods = list(WATCHDOG_CONFIG.get('fix_methods', ['service_restart', 'interface_restart', 'firewall_check']))
+            # The refresh API is always tried first (it is the cheapest fix)
+            fix_methods = WATCHDOG_CONFIG.get('fix_methods', frozenset({'service_restart', 'interface_restart', 'firewall_check'})) | {'api_refresh'}
             refresh_url = f"{WATCHDOG_CONFIG['app_url']}/api/security/camera/refresh"
-            if 'api_refresh' not in fix_methods:
-                fix_methods.insert(0, 'api_refresh')
             
             # Method 0: Camera refresh API (lightweight)
             if 'api_refresh' in fix_methods:
                 try:
                     self.logger.info(f"Calling camera refresh API: {refresh_url}")
-                    response = requests.post(refresh_url, json={'reason': 'watchdog auto refresh'}, timeout=WATCHDOG_CONFIG['network_timeout'])
+                    response = self.http.post(refresh_url, json={'reason': 'watchdog auto refresh'}, timeout=WATCHDOG_CONFIG['network_timeout'])
                     if response.status_code == 200 and response.json().get('success'):
                         self.logger.info("Camera refresh API reported success")
-                        time.sleep(3)
-                        if self.check_camera_connectivity():
+                        if self.camera_recovered(3):
                             self.logger.info("Camera connectivity restored after refresh API call")
                             return True
                         else:
@@ -410,11 +811,8 @@ class HomePiWatchdog:
             if 'service_restart' in fix_methods:
                 self.logger.info("Restarting homepi service to fix camera connectivity...")
                 if self.restart_service():
-                    # Wait for service to fully start
-                    time.sleep(15)
-                    
-                    # Test camera connectivity again
-                    if self.check_camera_connectivity():
+                    # Test camera connectivity again (as soon as the service is up)
+                    if self.camera_recovered(15):
                         self.logger.info("Camera connectivity restored after service restart")
                         return True
                     else:
@@ -425,35 +823,39 @@ class HomePiWatchdog:
                 self.logger.info("Trying network interface restart for camera connectivity...")
                 
                 # Get current network interface (WiFi or Ethernet)
-                success, stdout, stderr = self.run_command("ip route | grep default | awk '{print $5}' | head -1")
-                if success and stdout.strip():
-                    interface = stdout.strip()
+                interface = self.get_default_interface()
+                if interface:
                     self.logger.info(f"Restarting network interface: {interface}")
                     
                     # Restart the interface
-                    self.run_command(f"ip link set {interface} down")
+                    self.run_command(['ip', 'link', 'set', interface, 'down'])
                     time.sleep(2)
-                    self.run_command(f"ip link set {interface} up")
-                    time.sleep(10)
+                    self.run_command(['ip', 'link', 'set', interface, 'up'])
                     
                     # Test camera connectivity again
-                    if self.check_camera_connectivity():
+                    if self.camera_recovered(10):
                         self.logger.info("Camera connectivity restored after interface restart")
                         return True
             
             # Method 3: Firewall check
             if 'firewall_check' in fix_methods:
                 self.logger.info("Checking for firewall issues...")
-                success, stdout, stderr = self.run_command("iptables -L INPUT -n | grep 5000")
-                if success and stdout.strip():
-                    self.logger.warning(f"Found iptables rules for port 5000: {stdout.strip()}")
-                    # Try to allow port 5000
-                    self.run_command("iptables -I INPUT -p tcp --dport 5000 -j ACCEPT")
-                    time.sleep(5)
-                    
-                    if self.check_camera_connectivity():
-                        self.logger.info("Camera connectivity restored after firewall fix")
-                        return True
+                accept_rule = ['INPUT', '-p', 'tcp', '--dport', '5000', '-j', 'ACCEPT']
+                # Once our ACCEPT rule is in place the firewall isn't the
+                # problem; -C looks for it without dumping the whole chain
+                if self.run_command(['iptables', '-C'] + accept_rule)[0]:
+                    self.logger.info("Port 5000 is already allowed by iptables")
+                else:
+                    success, stdout, stderr = self.run_command(['iptables', '-S', 'INPUT'])
+                    port_rules = [line for line in stdout.splitlines() if '--dport 5000' in line]
+                    if success and port_rules:
+                        self.logger.warning(f"Found iptables rules for port 5000: {port_rules}")
+                        # Try to allow port 5000
+                        self.run_command(['iptables', '-I'] + accept_rule)
+                        
+                        if self.camera_recovered(5):
+                            self.logger.info("Camera connectivity restored after firewall fix")
+                            return True
             
             self.logger.warning("Camera connectivity fix attempt failed")
             return False
@@ -471,33 +873,32 @@ class HomePiWatchdog:
         
         try:
             # Check if this is a post-reboot fix
-            reboot_flag_file = '/tmp/homepi-watchdog-reboot'
-            is_post_reboot = os.path.exists(reboot_flag_file)
-            
-            if is_post_reboot:
+            if self.is_post_reboot:
+                self.is_post_reboot = False
                 self.logger.info("Post-reboot Bluetooth fix detected")
                 # Remove the reboot flag
                 try:
-                    os.remove(reboot_flag_file)
+                    os.remove(REBOOT_FLAG_FILE)
                 except:
                     pass
             
             # Restart Bluetooth service
-            self.run_command("systemctl restart bluetooth")
+            with self.own_unit_changes():
+                self.run_command(['systemctl', 'restart', 'bluetooth'])
             time.sleep(5)
             
             # Reset Bluetooth adapters
             for device in WATCHDOG_CONFIG['bluetooth_devices']:
-                self.run_command(f"hciconfig {device} down")
+                self.run_command(['hciconfig', device, 'down'])
                 time.sleep(1)
-                self.run_command(f"hciconfig {device} up")
+                self.run_command(['hciconfig', device, 'up'])
                 time.sleep(2)
             
             # Run the bluetooth fix script if it exists
             bluetooth_fix_script = "/home/mujadded/homepi/fix-pipewire-bluetooth.sh"
             if os.path.exists(bluetooth_fix_script):
                 self.logger.info("Running Bluetooth fix script...")
-                success, stdout, stderr = self.run_command(f"bash {bluetooth_fix_script}", timeout=120)
+                success, stdout, stderr = self.run_command(['bash', bluetooth_fix_script], timeout=120)
                 if success:
                     self.logger.info("Bluetooth fix script completed successfully")
                 else:
@@ -505,29 +906,28 @@ class HomePiWatchdog:
             else:
                 self.logger.warning("Bluetooth fix script not found")
             
-            time.sleep(10)  # Give more time for audio system to initialize
-            
-            # Check if Bluetooth sink is now available and running (run as user)
-            cmd = "sudo -u mujadded bash -c 'export PULSE_RUNTIME_PATH=/run/user/1000/pulse && pactl list short sinks | grep bluez | grep RUNNING'"
-            success, stdout, stderr = self.run_command(cmd)
-            self.logger.debug(f"Post-fix Bluetooth sink check command: {cmd}")
-            self.logger.debug(f"Post-fix Bluetooth sink check: success={success}, stdout='{stdout.strip()}', stderr='{stderr.strip()}'")
+            # Check if Bluetooth sink is now available and running (run as user),
+            # giving the audio system up to 10s to initialize
+            running_sinks = []
+            def sink_running():
+                running_sinks[:] = [name for name, state in self.get_bluetooth_sinks() if state == 'RUNNING']
+                return bool(running_sinks)
+            self.wait_until(sink_running, 10)
             
-            if success and stdout.strip():
-                sink_line = stdout.strip()
-                sink_name = sink_line.split()[1]
+            if running_sinks:
+                sink_name = running_sinks[0]
                 self.logger.info(f"Bluetooth sink found and running: {sink_name}")
                 
                 # Set as default sink and adjust volume (run as user)
-                set_default_cmd = f"sudo -u mujadded bash -c 'export PULSE_RUNTIME_PATH=/run/user/1000/pulse && pactl set-default-sink {sink_name}'"
-                set_volume_cmd = f"sudo -u mujadded bash -c 'export PULSE_RUNTIME_PATH=/run/user/1000/pulse && pactl set-sink-volume {sink_name} 70%'"
+                set_default_cmd = PACTL + ['set-default-sink', sink_name]
+                set_volume_cmd = PACTL + ['set-sink-volume', sink_name, '70%']
                 
-                self.logger.debug(f"Setting default sink: {set_default_cmd}")
-                success1, stdout1, stderr1 = self.run_command(set_default_cmd)
+                self.logger.debug(f"Setting default sink: {' '.join(set_default_cmd)}")
+                success1, stdout1, stderr1 = self.run_command(set_default_cmd, **PACTL_RUN_AS)
                 self.logger.debug(f"Set default sink result: success={success1}, stdout='{stdout1.strip()}', stderr='{stderr1.strip()}'")
                 
-                self.logger.debug(f"Setting sink volume: {set_volume_cmd}")
-                success2, stdout2, stderr2 = self.run_command(set_volume_cmd)
+                self.logger.debug(f"Setting sink volume: {' '.join(set_volume_cmd)}")
+                success2, stdout2, stderr2 = self.run_command(set_volume_cmd, **PACTL_RUN_AS)
                 self.logger.debug(f"Set sink volume result: success={success2}, stdout='{stdout2.strip()}', stderr='{stderr2.strip()}'")
                 
                 if self.check_bluetooth_status():
@@ -541,6 +941,30 @@ class HomePiWatchdog:
             self.logger.error(f"Error fixing Bluetooth: {e}")
             return False
     
+    def load_reboot_state(self):
+        """Restore the reboot rate-limit window saved before the last reboot"""
+        try:
+            with open(REBOOT_STATE_FILE, 'r') as f:
+                state = json.load(f)
+            self.reboot_window_start = datetime.fromisoformat(state['window_start'])
+            self.reboot_count = state['count']
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"Could not load reboot state: {e}")
+    
+    def save_reboot_state(self):
+        """Save the reboot rate-limit window (atomically, we're about to reboot)"""
+        temp_file = f"{REBOOT_STATE_FILE}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump({
+                'window_start': self.reboot_window_start.isoformat(),
+                'count': self.reboot_count
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, REBOOT_STATE_FILE)
+    
     def reboot_system(self):
         """Reboot the system as last resort"""
         if not WATCHDOG_CONFIG['enable_system_reboot']:
@@ -565,47 +989,112 @@ class HomePiWatchdog:
         self.reboot_count += 1
         
         try:
+            os.makedirs(STATE_DIR, exist_ok=True)
+            self.save_reboot_state()
+            
             # Create a flag file to indicate watchdog-initiated reboot
-            with open('/tmp/homepi-watchdog-reboot', 'w') as f:
+            with open(REBOOT_FLAG_FILE, 'w') as f:
                 f.write(f"{datetime.now().isoformat()}\n")
+            self.is_post_reboot = True
             
             # Use systemctl reboot instead of shutdown for more reliable reboot
             self.logger.critical("Executing systemctl reboot...")
-            self.run_command("systemctl reboot")
+            self.flush_logs()
+            self.run_command(['systemctl', 'reboot'])
             
             # If we get here, reboot command failed
             self.logger.error("systemctl reboot failed, trying alternative methods...")
             
             # Try alternative reboot methods
-            self.run_command("reboot")
+            self.run_command(['reboot'])
             time.sleep(2)
             
             # Last resort - force reboot
-            self.run_command("echo 1 > /proc/sys/kernel/sysrq && echo b > /proc/sysrq-trigger")
+            with open('/proc/sys/kernel/sysrq', 'w') as f:
+                f.write('1')
+            with open('/proc/sysrq-trigger', 'w') as f:
+                f.write('b')
             
             return True
         except Exception as e:
             self.logger.error(f"Error executing reboot: {e}")
             return False
     
-    def perform_health_check(self):
-        """Perform comprehensive health check"""
-        checks = {
-            'service': self.check_service_status(),
-            'app': self.check_app_health(),
-            'network': self.check_network_connectivity(),
-            'camera': self.check_camera_connectivity(),
-            'bluetooth': self.check_bluetooth_status(),
-            'resources': self.check_system_resources()
+    def check_warning(self, message, quiet=False):
+        """
+        Log why a health check failed
+        
+        While re-polling after fixes the failures were already reported by
+        the check that triggered them, so those callers pass quiet=True and
+        repeats go to debug.
+        """
+        self.logger.log(logging.DEBUG if quiet else logging.WARNING, message)
+    
+    def perform_health_check(self, only=None, deadline=None, quiet=False):
+        """
+        Perform comprehensive health check
+        
+        Args:
+            only: Optional list of check names to run instead of all of them
+            deadline: Optional time.monotonic() to give up by, if sooner than
+                check_timeout from now
+            quiet: Log check failures at debug instead of warning
+        """
+        checkers = {
+            'service': self.check_service_status,
+            'app': self.check_app_health,
+            'network': self.check_network_connectivity,
+            'camera': self.check_camera_connectivity,
+            'bluetooth': self.check_bluetooth_status,
+            'resources': self.check_system_resources
         }
+        if only is not None:
+            checkers = {name: checkers[name] for name in only}
+        
+        timeout_at = time.monotonic() + WATCHDOG_CONFIG['check_timeout']
+        deadline = timeout_at if deadline is None else min(deadline, timeout_at)
+        
+        # Run all checks concurrently so a cycle takes as long as the slowest
+        # check instead of the sum of them; the probing checks also stop at
+        # the deadline rather than outliving it
+        futures = {}
+        checks = {}
+        for name, check in checkers.items():
+            running = self.check_futures.get(name)
+            if running is not None and not running.done():
+                self.check_warning(f"Health check '{name}' is still running from an earlier check", quiet)
+                checks[name] = False
+                continue
+            if name in ('network', 'camera'):
+                futures[name] = self.check_pool.submit(check, deadline=deadline, quiet=quiet)
+            else:
+                futures[name] = self.check_pool.submit(check, quiet=quiet)
+            self.check_futures[name] = futures[name]
+        for name, future in futures.items():
+            try:
+                checks[name] = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeout:
+                self.check_warning(f"Health check '{name}' timed out", quiet)
+                checks[name] = False
+            except Exception as e:
+                self.logger.error(f"Health check '{name}' failed: {e}")
+                checks[name] = False
         
-        self.logger.info(f"Health check results: {checks}")
+        # Runs every cycle, so only format the results when debugging
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Health check results: {checks}")
         return all(checks.values()), checks
     
     def attempt_fixes(self, failed_checks):
         """Attempt to fix failed checks"""
         fixes_applied = []
         
+        # The Bluetooth/audio stack doesn't share anything with the service
+        # and network fixes below, so let its ~20s of restarts run alongside
+        bluetooth_fix = None
+        if not failed_checks.get('bluetooth', True):
+            bluetooth_fix = self.fix_pool.submit(self.fix_bluetooth)
+        
         # Fix service issues
         if not failed_checks.get('service', True):
             if self.restart_service():
@@ -622,8 +1111,8 @@ class HomePiWatchdog:
                 fixes_applied.append('network_fix')
         
         # Fix Bluetooth issues
-        if not failed_checks.get('bluetooth', True):
-            if self.fix_bluetooth():
+        if bluetooth_fix is not None:
+            if bluetooth_fix.result():
                 fixes_applied.append('bluetooth_fix')
         
         return fixes_applied
@@ -631,6 +1120,9 @@ class HomePiWatchdog:
     def run_watchdog_cycle(self):
         """Run one watchdog cycle"""
         try:
+            # Pick up edits to watchdog_config.json without a restart
+            get_config()
+            
             # Perform health check
             is_healthy, check_results = self.perform_health_check()
             
@@ -647,15 +1139,20 @@ class HomePiWatchdog:
             fixes_applied = self.attempt_fixes(check_results)
             if fixes_applied:
                 self.logger.info(f"Applied fixes: {fixes_applied}")
-                # Wait a bit for fixes to take effect
-                time.sleep(30)
-                
-                # Re-check after fixes
-                is_healthy_after_fix, _ = self.perform_health_check()
+                # Re-check only what failed (the passing checks weren't
+                # touched), giving the fixes up to 30s to take effect
+                failed = [name for name, passed in check_results.items() if not passed]
+                recheck_deadline = time.monotonic() + 30
+                is_healthy_after_fix = self.wait_until(
+                    lambda: self.perform_health_check(only=failed, deadline=recheck_deadline, quiet=True)[0],
+                    30,
+                    interval=5
+                )
                 if is_healthy_after_fix:
                     self.failure_count = 0
                     self.logger.info("System recovered after fixes")
                     return True
+                self.logger.warning(f"Checks still failing after fixes: {failed}")
             
             # If we've reached max failures, consider reboot
             if self.failure_count >= WATCHDOG_CONFIG['max_failures']:
@@ -672,9 +1169,7 @@ class HomePiWatchdog:
     
     def check_post_reboot_status(self):
         """Check if we need to run post-reboot fixes"""
-        reboot_flag_file = '/tmp/homepi-watchdog-reboot'
-        
-        if os.path.exists(reboot_flag_file):
+        if self.is_post_reboot:
             self.logger.info("Post-reboot detected, checking system status...")
             
             # Wait a bit for system to fully boot
@@ -697,29 +1192,84 @@ class HomePiWatchdog:
                     self.logger.info(f"Post-reboot fixes applied: {fixes_applied}")
             
             # Remove reboot flag
+            self.is_post_reboot = False
             try:
-                os.remove(reboot_flag_file)
+                os.remove(REBOOT_FLAG_FILE)
                 self.logger.info("Reboot flag removed")
             except:
                 pass
 
+    def watch_unit_changes(self):
+        """
+        Wake the main loop as soon as a critical unit stops (runs on its own thread)
+        
+        Subscribes to systemd's PropertiesChanged signals over D-Bus so
+        failures are handled right away instead of at the next poll; the
+        timed checks keep running either way.
+        """
+        try:
+            with DBus() as bus:
+                manager = Manager(bus=bus, _autoload=True)
+                manager.Manager.Subscribe()
+                watched = {
+                    Unit(name.encode(), bus=bus, _autoload=True).path: name
+                    for name in WATCHDOG_CONFIG['critical_services']
+                }
+                
+                def on_properties_changed(msg, error=None, userdata=None):
+                    msg.process_reply(True)
+                    name = watched.get(msg.get_path())
+                    if name is None:
+                        return
+                    interface, changed, invalidated = msg.body
+                    state = changed.get(b'ActiveState')
+                    if state in (b'failed', b'inactive', b'deactivating'):
+                        if time.monotonic() < self.own_unit_changes_until:
+                            self.logger.debug(f"{name} changed to {state.decode()} during a fix, ignoring")
+                            return
+                        self.logger.warning(f"{name} changed to {state.decode()}, running checks now")
+                        self.wake.set()
+                
+                bus.match_signal(
+                    b'org.freedesktop.systemd1',
+                    None,
+                    b'org.freedesktop.DBus.Properties',
+                    b'PropertiesChanged',
+                    on_properties_changed,
+                    None
+                )
+                self.logger.info(f"Watching units: {list(watched.values())}")
+                
+                fd = bus.get_fd()
+                while True:
+                    select.select([fd], [], [], WATCHDOG_CONFIG['check_interval'])
+                    # One state change brings several signals (Unit, Service,
+                    # ...) and process() handles one message per call; those
+                    # already read off the fd won't wake select() again
+                    while bus.process() > 0:
+                        pass
+        except Exception as e:
+            self.logger.warning(f"Unit watcher stopped, relying on timed checks: {e}")
+    
     def run(self):
         """Main watchdog loop"""
         self.logger.info("Starting HomePi Watchdog Service")
+        signal.signal(signal.SIGTERM, self.handle_sigterm)
         
         # Check for post-reboot fixes first
         self.check_post_reboot_status()
         
+        if pystemd_available:
+            threading.Thread(target=self.watch_unit_changes, name="UnitWatcher", daemon=True).start()
+        
         while True:
             try:
-                # Rotate logs if needed
-                self.log_rotate()
-                
                 # Run watchdog cycle
                 self.run_watchdog_cycle()
                 
-                # Wait before next check
-                time.sleep(WATCHDOG_CONFIG['check_interval'])
+                # Wait before next check, or until a unit change wakes us
+                self.wake.wait(WATCHDOG_CONFIG['check_interval'])
+                self.wake.clear()
                 
             except KeyboardInterrupt:
                 self.logger.info("Watchdog service stopped by user")
@@ -727,6 +1277,8 @@ class HomePiWatchdog:
             except Exception as e:
                 self.logger.error(f"Unexpected error in watchdog loop: {e}")
                 time.sleep(60)  # Wait a minute before retrying
+        
+        self.http.close()
 
 if __name__ == "__main__":
     watchdog = HomePiWatchdog()
@@ -53,6 +53,14 @@ else
     }
 fi
 
+# Optional: lets the watchdog query systemd over D-Bus instead of running systemctl
+if apt list --installed | grep -q "python3-pystemd"; then
+    echo "pystemd already installed via apt"
+else
+    echo "Installing pystemd via apt..."
+    apt-get install -y python3-pystemd || echo "pystemd not available, watchdog will use systemctl"
+fi
+
 # Install systemd service
 echo "Installing systemd service..."
 cp "$HOMEPI_DIR/homepi-watchdog.service" /etc/systemd/system/
@@ -1,29 +1,72 @@
 """
 HomePi AI Inference Server for Nvidia Jetson Orin
-Provides REST API for object detection using PyTorch YOLOv5
+Provides REST API for object detection using YOLOv5 (a TensorRT FP16 engine
+on CUDA, plain PyTorch otherwise)
 """
 
 import os
+import sys
+import glob
 import time
 import base64
+import contextlib
 import json
 import logging
-from io import BytesIO
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import cv2
 import numpy as np
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from PIL import Image
 
 # Try to import torch
 try:
     import torch
+    import torchvision
     TORCH_AVAILABLE = True
 except ImportError:
     TORCH_AVAILABLE = False
     print("⚠ PyTorch not available")
 
+# TensorRT is optional; without it the PyTorch model runs directly
+try:
+    import tensorrt as trt
+    TRT_AVAILABLE = True
+    TRT_LOGGER = trt.Logger(trt.Logger.WARNING)
+except ImportError:
+    TRT_AVAILABLE = False
+    print("⚠ TensorRT not available, using PyTorch")
+
+# orjson is optional; it's several times faster than json on detection lists
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Model settings
+MODEL_NAME = 'yolov5s'
+MODEL_DIR = os.environ.get('MODEL_DIR', 'models')  # ONNX export and TensorRT engines are cached here
+INPUT_SIZE = 640
+# Images no larger than SMALL_IMAGE_MAX run at SMALL_INPUT_SIZE instead
+# (about 2.4x less compute) rather than being padded up to INPUT_SIZE
+SMALL_INPUT_SIZE = 416
+SMALL_IMAGE_MAX = 480
+BUCKET_SIZES = (SMALL_INPUT_SIZE, INPUT_SIZE)
+IOU_THRESHOLD = 0.45  # NMS IOU threshold
+# Concurrent requests are batched: up to MAX_BATCH images, waiting at most
+# BATCH_TIMEOUT_MS after the first one for others to arrive
+MAX_BATCH = 8
+BATCH_TIMEOUT_MS = 5
+INFERENCE_TIMEOUT = 10  # Seconds a request waits for its batch
+# Batches run concurrently on the GPU, each TensorRT one on its own
+# execution context and CUDA stream: YOLOv5s alone leaves SMs idle
+INFERENCE_STREAMS = 3
+# Written by --calibrate; when present an INT8 engine is built instead of FP16
+CALIBRATION_CACHE = os.path.join(MODEL_DIR, f'{MODEL_NAME}_calib.cache')
+
 # COCO class names (80 classes)
 COCO_CLASSES = [
     'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train', 'truck',
@@ -39,6 +82,7 @@ COCO_CLASSES = [
     'refrigerator', 'book', 'clock', 'vase', 'scissors', 'teddy bear', 'hair drier',
     'toothbrush'
 ]
+CLASS_IDS = {name: class_id for class_id, name in enumerate(COCO_CLASSES)}
 
 app = Flask(__name__)
 CORS(app)
@@ -46,23 +90,347 @@ CORS(app)
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-# Global model state
-model = None
+# Global model state (one model per bucket size; PyTorch shares one for all)
+models = {}
 model_loaded = False
 device = 'cpu'
+backend = 'pytorch'
+precision = 'fp32'
+# (bucket size, queued at, letterboxed image, threshold, Future) waiting for
+# the batch worker, which batches each bucket size separately; None wakes it
+# when a batch finishes and frees a slot
+batch_queue = queue.Queue()
+batch_thread = None
+# Runs the batches; the batch worker takes a slot before sending one, and
+# while every stream is busy it keeps filling the next batches instead
+batch_executor = ThreadPoolExecutor(max_workers=INFERENCE_STREAMS)
+batch_slots = threading.BoundedSemaphore(INFERENCE_STREAMS)
+# Pinned host buffers letterbox_gpu() uploads frames through, as
+# (buffer, event recorded after its last copy); one per concurrent request
+upload_buffers = queue.SimpleQueue()
+
+
+class TensorRTContext:
+    """One execution context of a TensorRT engine, with its own CUDA stream and buffers"""
+    
+    def __init__(self, engine, profile):
+        self.context = engine.create_execution_context()
+        self.stream = torch.cuda.Stream()
+        # Contexts running at the same time each need their own profile
+        self.context.set_optimization_profile_async(profile, self.stream.cuda_stream)
+        
+        # Input and output are device buffers allocated once at startup,
+        # sized for the largest batch the engine accepts
+        input_shape = tuple(engine.get_tensor_profile_shape('images', profile)[2])
+        self.max_batch = input_shape[0]
+        self.context.set_input_shape('images', input_shape)
+        output_shape = tuple(self.context.get_tensor_shape('output0'))
+        self.input = torch.empty(input_shape, dtype=torch.float32, device='cuda')
+        self.output = torch.empty(output_shape, dtype=torch.float32, device='cuda')
+        self.context.set_tensor_address('images', self.input.data_ptr())
+        self.context.set_tensor_address('output0', self.output.data_ptr())
+    
+    def __call__(self, batch):
+        """
+        Run the engine
+        
+        Args:
+            batch: float32 CUDA tensor (n, 3, size, size), RGB 0-1, for the
+                size the engine was built for and n <= max_batch
+        
+        Returns:
+            Raw predictions (n, anchors, 85); overwritten by the next call
+        """
+        n = batch.shape[0]
+        self.context.set_input_shape('images', tuple(batch.shape))
+        self.input[:n].copy_(batch)
+        # Queue on torch's stream (this context's, see TensorRTModel.acquire)
+        # so the copy above and the post-processing that reads self.output
+        # are ordered around it
+        self.context.execute_async_v3(torch.cuda.current_stream().cuda_stream)
+        return self.output[:n]
+
+
+class TensorRTModel:
+    """
+    Runs a serialized TensorRT engine, returning raw YOLOv5 predictions
+    
+    The engine has one optimization profile per execution context, so up to
+    INFERENCE_STREAMS batches run on the GPU at once, each on its own stream.
+    """
+    
+    def __init__(self, engine_path):
+        runtime = trt.Runtime(TRT_LOGGER)
+        with open(engine_path, 'rb') as f:
+            self.engine = runtime.deserialize_cuda_engine(f.read())
+        if self.engine is None:
+            raise RuntimeError(f"Could not load TensorRT engine {engine_path}")
+        
+        contexts = [
+            TensorRTContext(self.engine, profile)
+            for profile in range(min(INFERENCE_STREAMS, self.engine.num_optimization_profiles))
+        ]
+        self.max_batch = contexts[0].max_batch
+        self.contexts = queue.Queue()
+        for context in contexts:
+            self.contexts.put(context)
+    
+    @contextlib.contextmanager
+    def acquire(self):
+        """
+        Borrow a free execution context, blocking until one is
+        
+        Inside the with block torch works on the context's stream; its
+        output stays valid until the block exits.
+        """
+        context = self.contexts.get()
+        try:
+            # Wait for the batch staged on the default stream
+            context.stream.wait_stream(torch.cuda.default_stream())
+            with torch.cuda.stream(context.stream):
+                yield context
+                context.stream.synchronize()
+        finally:
+            self.contexts.put(context)
+
+
+class TorchModel:
+    """Runs the YOLOv5 PyTorch network, returning raw predictions like TensorRTModel"""
+    
+    def __init__(self, network):
+        self.network = network
+        self.max_batch = MAX_BATCH
+        # NHWC lets cuDNN pick Tensor Core kernels without an internal
+        # transpose; on CPU it's slower, so only on CUDA
+        self.channels_last = device == 'cuda'
+        if self.channels_last:
+            self.network = network.to(memory_format=torch.channels_last)
+    
+    def __call__(self, batch):
+        if self.channels_last:
+            batch = batch.contiguous(memory_format=torch.channels_last)
+        # FP16 on CUDA runs the convolutions on the Tensor Cores
+        with torch.inference_mode(), torch.autocast('cuda', dtype=torch.float16, enabled=batch.is_cuda):
+            output = self.network(batch)
+        # Predictions come first: (predictions,) when prepared for tracing,
+        # (predictions, feature maps) otherwise
+        output = output[0] if isinstance(output, (list, tuple)) else output
+        return output.float()
+    
+    def acquire(self):
+        """Counterpart of TensorRTModel.acquire; the network can be called from any thread"""
+        return contextlib.nullcontext(self)
+
+
+if TRT_AVAILABLE:
+    class EntropyCalibrator(trt.IInt8EntropyCalibrator2):
+        """
+        Feeds sample frames through TensorRT's INT8 calibration
+        
+        With no image paths it only replays an existing calibration cache.
+        """
+        
+        def __init__(self, image_paths, cache_path, size=INPUT_SIZE):
+            trt.IInt8EntropyCalibrator2.__init__(self)
+            self.image_paths = list(image_paths)
+            self.cache_path = cache_path
+            self.size = size
+            self.batch = torch.empty((1, 3, size, size), dtype=torch.float32, device='cuda')
+        
+        def get_batch_size(self):
+            return 1
+        
+        def get_batch(self, names):
+            while self.image_paths:
+                image = cv2.imread(self.image_paths.pop())
+                if image is None:
+                    continue
+                padded, _, _ = letterbox(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), self.size)
+                self.batch.copy_(torch.from_numpy(padded).permute(2, 0, 1).unsqueeze(0).float() / 255)
+                torch.cuda.synchronize()
+                return [int(self.batch.data_ptr())]
+            return None
+        
+        def read_calibration_cache(self):
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, 'rb') as f:
+                    return f.read()
+            return None
+        
+        def write_calibration_cache(self, cache):
+            with open(self.cache_path, 'wb') as f:
+                f.write(cache)
+
+
+def load_hub_model():
+    """Load the YOLOv5 network from torch hub (downloads on first run)"""
+    logger.info(f"Loading {MODEL_NAME} model from torch hub...")
+    hub_model = torch.hub.load('ultralytics/yolov5', MODEL_NAME, pretrained=True)
+    
+    # Unwrap AutoShape -> DetectMultiBackend -> DetectionModel; pre- and
+    # post-processing are done here so TensorRT and PyTorch share them
+    return hub_model.model.model.to(device).eval()
+
+
+def prepare_for_tracing(network):
+    """Set up the Detect() head like yolov5's export.py does before tracing"""
+    detect = network.model[-1]
+    detect.export = True    # Return only the concatenated predictions
+    detect.dynamic = True   # Build the anchor grid from the input shape
+    detect.inplace = False
+    return network
+
+
+def load_torch_network():
+    """
+    Load the PyTorch network, from a cached TorchScript trace when there is one
+    
+    The trace is saved on first load, so later starts skip torch hub (and
+    its network round trip) entirely.
+    """
+    traced_path = os.path.join(MODEL_DIR, f'{MODEL_NAME}_traced.pt')
+    if os.path.exists(traced_path):
+        logger.info(f"Loading TorchScript model {traced_path}...")
+        return torch.jit.load(traced_path, map_location=device).eval()
+    
+    network = prepare_for_tracing(load_hub_model())
+    try:
+        os.makedirs(MODEL_DIR, exist_ok=True)
+        dummy = torch.zeros(1, 3, INPUT_SIZE, INPUT_SIZE, device=device)
+        with torch.no_grad():
+            traced = torch.jit.trace(network, dummy)
+        torch.jit.save(traced, traced_path + '.tmp')
+        os.replace(traced_path + '.tmp', traced_path)
+        logger.info(f"✓ TorchScript model saved to {traced_path}")
+    except Exception as e:
+        logger.warning(f"⚠ Could not cache TorchScript model: {e}")
+    return network
+
+
+def export_onnx():
+    """Export the hub model to ONNX with a dynamic batch (once) and return its path"""
+    onnx_path = os.path.join(MODEL_DIR, f'{MODEL_NAME}.onnx')
+    if os.path.exists(onnx_path):
+        return onnx_path
+    
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    network = prepare_for_tracing(load_hub_model())
+    
+    logger.info(f"Exporting {MODEL_NAME} to ONNX...")
+    dummy = torch.zeros(1, 3, INPUT_SIZE, INPUT_SIZE, device=device)
+    torch.onnx.export(
+        network,
+        dummy,
+        onnx_path,
+        opset_version=13,
+        input_names=['images'],
+        output_names=['output0'],
+        dynamic_axes={
+            'images': {0: 'batch', 2: 'height', 3: 'width'},
+            'output0': {0: 'batch', 1: 'anchors'}
+        }
+    )
+    return onnx_path
+
+
+def build_engine(onnx_path, engine_path, size=INPUT_SIZE, calibrator=None):
+    """
+    Build an FP16 (or INT8) TensorRT engine from the ONNX export
+    
+    Args:
+        onnx_path: ONNX model from export_onnx()
+        engine_path: Where to save the serialized engine
+        size: Input width/height the engine is built for
+        calibrator: EntropyCalibrator to build an INT8 engine with
+    """
+    logger.info(f"Building TensorRT engine {engine_path} (this takes a few minutes)...")
+    builder = trt.Builder(TRT_LOGGER)
+    network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+    parser = trt.OnnxParser(network, TRT_LOGGER)
+    if not parser.parse_from_file(onnx_path):
+        errors = [str(parser.get_error(i)) for i in range(parser.num_errors)]
+        raise RuntimeError(f"Could not parse {onnx_path}: {errors}")
+    
+    config = builder.create_builder_config()
+    config.set_memory_pool_limit(trt.MemoryPoolType.WORKSPACE, 1 << 30)
+    config.set_flag(trt.BuilderFlag.FP16)
+    
+    # Fixed image size so TensorRT picks kernels for exactly that; the
+    # batch dimension covers everything the batch worker can send. One
+    # identical profile per concurrent execution context
+    for _ in range(INFERENCE_STREAMS):
+        profile = builder.create_optimization_profile()
+        profile.set_shape(
+            'images',
+            (1, 3, size, size),
+            (max(1, MAX_BATCH // 2), 3, size, size),
+            (MAX_BATCH, 3, size, size)
+        )
+        config.add_optimization_profile(profile)
+    
+    # INT8 where calibrated, FP16 for layers without an INT8 kernel
+    if calibrator is not None:
+        config.set_flag(trt.BuilderFlag.INT8)
+        config.int8_calibrator = calibrator
+        # The calibrator feeds one image at a time
+        single = (1, 3, size, size)
+        calibration_profile = builder.create_optimization_profile()
+        calibration_profile.set_shape('images', single, single, single)
+        config.set_calibration_profile(calibration_profile)
+    
+    serialized = builder.build_serialized_network(network, config)
+    if serialized is None:
+        raise RuntimeError("TensorRT engine build failed")
+    
+    # Write then rename so an interrupted build never leaves a bad engine
+    with open(engine_path + '.tmp', 'wb') as f:
+        f.write(serialized)
+    os.replace(engine_path + '.tmp', engine_path)
+    logger.info(f"✓ TensorRT engine saved to {engine_path}")
+
+
+def engine_path_for(int8, size=INPUT_SIZE):
+    """Path of the cached TensorRT engine for the given precision and input size"""
+    suffix = '_int8' if int8 else ''
+    return os.path.join(MODEL_DIR, f'{MODEL_NAME}_{size}_b{MAX_BATCH}x{INFERENCE_STREAMS}{suffix}.engine')
+
+
+def warm_up(runs=3):
+    """
+    Run a few dummy batches through each bucket's model
+    
+    cuDNN picks its algorithms and CUDA/TensorRT load their kernels on the
+    first passes, which would otherwise land on the first real requests.
+    With benchmark on, cuDNN tunes again for every new input shape, so the
+    PyTorch path is warmed up at each batch size the batcher can send.
+    """
+    batch_sizes = (1,)
+    if device == 'cuda':
+        torch.backends.cudnn.benchmark = True
+        if backend == 'pytorch':
+            batch_sizes = range(1, MAX_BATCH + 1)
+    
+    for size in BUCKET_SIZES:
+        for batch_size in batch_sizes:
+            dummy = torch.zeros(batch_size, 3, size, size, device=device)
+            for _ in range(runs):
+                with models[size].acquire() as model:
+                    model(dummy)
+    
+    if device == 'cuda':
+        torch.cuda.synchronize()
+    logger.info("✓ Warmup complete")
 
 
 def load_model():
-    """Load YOLOv5 model from torch hub"""
-    global model, model_loaded, device
+    """Load YOLOv5, preferring a cached TensorRT engine on CUDA"""
+    global models, model_loaded, device, backend, precision, batch_thread
     
     if not TORCH_AVAILABLE:
         logger.error("PyTorch not available, cannot load model")
         return False
     
     try:
-        logger.info("Loading YOLOv5s model from torch hub...")
-        
         # Detect device
         if torch.cuda.is_available():
             device = 'cuda'
@@ -71,19 +439,39 @@ def load_model():
             device = 'cpu'
             logger.warning("⚠ CUDA not available, using CPU")
         
-        # Load YOLOv5 from torch hub
-        # This will download the model on first run
-        model = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True)
-        model.to(device)
-        model.eval()
+        models = {}
+        if device == 'cuda' and TRT_AVAILABLE:
+            # Engines (one per bucket size) are built once and cached, so
+            # later starts skip both the build and torch hub
+            int8 = os.path.exists(CALIBRATION_CACHE)
+            try:
+                for size in BUCKET_SIZES:
+                    engine_path = engine_path_for(int8, size)
+                    if not os.path.exists(engine_path):
+                        calibrator = EntropyCalibrator([], CALIBRATION_CACHE, size) if int8 else None
+                        build_engine(export_onnx(), engine_path, size, calibrator=calibrator)
+                    models[size] = TensorRTModel(engine_path)
+                backend = 'tensorrt'
+                precision = 'int8' if int8 else 'fp16'
+            except Exception as e:
+                logger.warning(f"⚠ TensorRT engine unavailable, using PyTorch: {e}")
+                models = {}
         
-        # Configure model
-        model.conf = 0.6  # Default confidence threshold
-        model.iou = 0.45  # NMS IOU threshold
+        if not models:
+            network = TorchModel(load_torch_network())
+            models = {size: network for size in BUCKET_SIZES}
+            backend = 'pytorch'
+            precision = 'fp16' if device == 'cuda' else 'fp32'
+        
+        warm_up()
         
         model_loaded = True
-        logger.info("✓ YOLOv5s model loaded successfully")
+        if batch_thread is None:
+            batch_thread = threading.Thread(target=batch_worker, daemon=True)
+            batch_thread.start()
+        logger.info(f"✓ {MODEL_NAME} model loaded successfully")
         logger.info(f"  Device: {device}")
+        logger.info(f"  Backend: {backend} ({precision})")
         logger.info(f"  Classes: {len(COCO_CLASSES)}")
         
         return True
@@ -94,31 +482,245 @@ def load_model():
         return False
 
 
+def decode_jpeg(img_bytes):
+    """
+    Decode JPEG (or PNG) bytes straight to an RGB numpy array
+    
+    cv2.imdecode (libjpeg-turbo) decodes straight into one array; grey and
+    RGBA images come out as 3-channel too
+    """
+    try:
+        image = cv2.imdecode(np.frombuffer(img_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    except cv2.error as e:
+        logger.error(f"Error decoding image: {e}")
+        return None
+    if image is None:
+        logger.error("Error decoding image: not a valid JPEG/PNG")
+        return None
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+
+
 def decode_image(b64_string):
-    """Decode base64 image to numpy array"""
+    """Decode base64 image to numpy array (RGB)"""
     try:
-        # Decode base64
-        img_bytes = base64.b64decode(b64_string)
-        
-        # Load with PIL
-        pil_img = Image.open(BytesIO(img_bytes))
-        
-        # Convert to numpy RGB
-        img_array = np.array(pil_img)
-        
-        # Ensure RGB format
-        if len(img_array.shape) == 2:  # Grayscale
-            img_array = cv2.cvtColor(img_array, cv2.COLOR_GRAY2RGB)
-        elif img_array.shape[2] == 4:  # RGBA
-            img_array = cv2.cvtColor(img_array, cv2.COLOR_RGBA2RGB)
-        
-        return img_array
-        
+        return decode_jpeg(base64.b64decode(b64_string))
     except Exception as e:
         logger.error(f"Error decoding image: {e}")
         return None
 
 
+def calibrate(image_dir, max_images=500):
+    """
+    Calibrate INT8 on sample frames and build the INT8 engine for each bucket
+    
+    Args:
+        image_dir: Directory of representative JPEG/PNG frames (e.g. the Pi's
+            detections/ snapshots)
+        max_images: Most frames to calibrate on
+    """
+    global device
+    
+    if not (TRT_AVAILABLE and torch.cuda.is_available()):
+        print("ERROR: INT8 calibration needs TensorRT and CUDA")
+        return False
+    device = 'cuda'
+    
+    image_paths = sorted(
+        glob.glob(os.path.join(image_dir, '*.jpg')) + glob.glob(os.path.join(image_dir, '*.png'))
+    )[:max_images]
+    if not image_paths:
+        print(f"ERROR: No images found in {image_dir}")
+        return False
+    
+    # Start from scratch; TensorRT skips calibration if a cache is readable,
+    # and every bucket's engine was built from the old calibration
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    stale = [CALIBRATION_CACHE] + [engine_path_for(int8=True, size=size) for size in BUCKET_SIZES]
+    for path in stale:
+        if os.path.exists(path):
+            os.remove(path)
+    
+    print(f"Calibrating INT8 on {len(image_paths)} frames...")
+    onnx_path = export_onnx()
+    build_engine(
+        onnx_path,
+        engine_path_for(int8=True),
+        calibrator=EntropyCalibrator(image_paths, CALIBRATION_CACHE)
+    )
+    print(f"✓ Calibration cache saved to {CALIBRATION_CACHE}")
+    
+    # The other buckets replay the new cache
+    for size in BUCKET_SIZES:
+        if size != INPUT_SIZE:
+            build_engine(
+                onnx_path,
+                engine_path_for(int8=True, size=size),
+                size,
+                calibrator=EntropyCalibrator([], CALIBRATION_CACHE, size)
+            )
+    return True
+
+
+def letterbox_geometry(height, width, size):
+    """Scale, resized (width, height) and (pad_x, pad_y) to fit an image into size x size"""
+    scale = min(size / height, size / width)
+    new_width, new_height = round(width * scale), round(height * scale)
+    return scale, (new_width, new_height), ((size - new_width) // 2, (size - new_height) // 2)
+
+
+def letterbox(image, size=INPUT_SIZE):
+    """
+    Resize image to fit size x size keeping its aspect ratio, padding grey
+    
+    Returns:
+        (padded image, scale, (pad_x, pad_y))
+    """
+    height, width = image.shape[:2]
+    scale, (new_width, new_height), (pad_x, pad_y) = letterbox_geometry(height, width, size)
+    
+    padded = np.full((size, size, 3), 114, dtype=np.uint8)
+    padded[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = cv2.resize(
+        image, (new_width, new_height), interpolation=cv2.INTER_LINEAR
+    )
+    return padded, scale, (pad_x, pad_y)
+
+
+def upload_frame(image):
+    """
+    Copy a uint8 HWC frame to the GPU through a reused pinned host buffer
+    
+    The copy is an async DMA from page-locked memory, with no pageable
+    staging copy or host allocation per request.
+    """
+    try:
+        host, copied = upload_buffers.get_nowait()
+    except queue.Empty:
+        host, copied = None, torch.cuda.Event()
+    if host is None or host.numel() < image.size:
+        host = torch.empty(max(image.size, INPUT_SIZE * INPUT_SIZE * 3), dtype=torch.uint8, pin_memory=True)
+    
+    # Wait for the buffer's previous upload before overwriting it
+    copied.synchronize()
+    staged = host[:image.size].view(image.shape)
+    staged.copy_(torch.from_numpy(image))
+    frame = staged.to(device, non_blocking=True)
+    copied.record()
+    upload_buffers.put((host, copied))
+    return frame
+
+
+def letterbox_gpu(image, size=INPUT_SIZE):
+    """
+    letterbox() on the GPU: upload the frame once, then resize and pad there
+    
+    Returns:
+        (float CUDA tensor (3, size, size), RGB 0-1, scale, (pad_x, pad_y))
+    """
+    height, width = image.shape[:2]
+    scale, (new_width, new_height), (pad_x, pad_y) = letterbox_geometry(height, width, size)
+    
+    frame = upload_frame(image).permute(2, 0, 1).unsqueeze(0).float()
+    resized = torch.nn.functional.interpolate(
+        frame, size=(new_height, new_width), mode='bilinear', align_corners=False
+    )
+    padded = torch.full((3, size, size), 114 / 255, device=device)
+    padded[:, pad_y:pad_y + new_height, pad_x:pad_x + new_width] = resized[0] / 255
+    return padded, scale, (pad_x, pad_y)
+
+
+def postprocess(pred, thresholds, iou_threshold=IOU_THRESHOLD, max_det=300):
+    """
+    Confidence filter + per-class NMS on raw YOLOv5 predictions
+    
+    Args:
+        pred: Raw predictions (batch, anchors, 85): xywh, objectness, class scores
+        thresholds: confidence threshold for each image in the batch
+    
+    Returns:
+        One (n, 6) tensor per image: [x1, y1, x2, y2, conf, class]
+    """
+    output = []
+    for x, threshold in zip(pred, thresholds):
+        x = x[x[:, 4] > threshold]
+        conf, cls = (x[:, 5:] * x[:, 4:5]).max(1)
+        keep = conf > threshold
+        x, conf, cls = x[keep], conf[keep], cls[keep]
+        
+        boxes = torch.cat((x[:, :2] - x[:, 2:4] / 2, x[:, :2] + x[:, 2:4] / 2), 1)
+        i = torchvision.ops.batched_nms(boxes, conf, cls, iou_threshold)[:max_det]
+        output.append(torch.cat((boxes[i], conf[i, None], cls[i, None].float()), 1))
+    return output
+
+
+def bucket_size(image):
+    """Model input size for image: the small bucket if it fits, else INPUT_SIZE"""
+    return SMALL_INPUT_SIZE if max(image.shape[:2]) <= SMALL_IMAGE_MAX else INPUT_SIZE
+
+
+def stage_batch(images):
+    """Stack letterboxed images into a float (n, 3, size, size) batch on the device"""
+    if device == 'cuda':
+        # Already letterboxed on the GPU by letterbox_gpu()
+        return torch.stack(images)
+    return torch.from_numpy(np.stack(images)).permute(0, 3, 1, 2).float() / 255
+
+
+def run_batch(size, items):
+    """Run one batch of same-size (letterboxed image, threshold, Future) items"""
+    try:
+        batch = stage_batch([padded for padded, _, _ in items])
+        with models[size].acquire() as model:
+            preds = postprocess(model(batch), [threshold for _, threshold, _ in items])
+            results = [pred.cpu().numpy() for pred in preds]
+        for (_, _, future), result in zip(items, results):
+            future.set_result(result)
+    except Exception as e:
+        logger.error(f"Batch inference error: {e}")
+        for _, _, future in items:
+            future.set_exception(e)
+    finally:
+        batch_slots.release()
+        batch_queue.put(None)
+
+
+def batch_worker():
+    """
+    Run queued images through the model, batching concurrent requests
+    
+    Each bucket size has its own pending batch, run once it is full or its
+    oldest image has waited BATCH_TIMEOUT_MS since being queued. While every
+    stream is busy, images keep collecting so the next batches go out fuller.
+    """
+    timeout = BATCH_TIMEOUT_MS / 1000
+    pending = {size: [] for size in BUCKET_SIZES}  # size -> [(queued at, image, threshold, Future)]
+    stalled = False  # A batch was due but no slot was free
+    while True:
+        # Sleep until work arrives, a slot frees up or the oldest pending
+        # batch is due (no point waking for that while stalled)
+        due = [items[0][0] + timeout for items in pending.values() if items]
+        wait = max(0, min(due) - time.monotonic()) if due and not stalled else None
+        try:
+            item = batch_queue.get(timeout=wait)
+            if item is None:
+                stalled = False
+            else:
+                size, *item = item
+                pending[size].append(item)
+        except queue.Empty:
+            pass
+        
+        now = time.monotonic()
+        for size, items in pending.items():
+            max_batch = models[size].max_batch
+            while items and (len(items) >= max_batch or now - items[0][0] >= timeout):
+                if not batch_slots.acquire(blocking=False):
+                    stalled = True
+                    break
+                batch = items[:max_batch]
+                del items[:max_batch]
+                batch_executor.submit(run_batch, size, [item for _, *item in batch])
+
+
 def run_inference(image, threshold=0.6, classes_filter=None):
     """
     Run inference on image
@@ -131,56 +733,64 @@ def run_inference(image, threshold=0.6, classes_filter=None):
     Returns:
         list of detections
     """
-    global model, model_loaded
+    global models, model_loaded
     
-    if not model_loaded or model is None:
+    if not model_loaded or not models:
         logger.error("Model not loaded")
         return []
     
     try:
-        # Set confidence threshold
-        model.conf = threshold
+        # Get image dimensions
+        img_height, img_width = image.shape[:2]
         
         # Run inference
         start_time = time.time()
         
-        with torch.no_grad():
-            results = model(image)
+        # Letterbox here, in parallel across request threads (on the GPU
+        # when there is one), and hand the result to the batch worker
+        size = bucket_size(image)
+        if device == 'cuda':
+            padded, scale, (pad_x, pad_y) = letterbox_gpu(image, size)
+        else:
+            padded, scale, (pad_x, pad_y) = letterbox(image, size)
+        future = Future()
+        batch_queue.put((size, time.monotonic(), padded, threshold, future))
+        
+        # Get predictions (xyxy format)
+        pred = future.result(timeout=INFERENCE_TIMEOUT)  # [x1, y1, x2, y2, conf, class]
+        
+        # Map boxes from the letterboxed input back onto the image
+        pred[:, [0, 2]] = ((pred[:, [0, 2]] - pad_x) / scale).clip(0, img_width)
+        pred[:, [1, 3]] = ((pred[:, [1, 3]] - pad_y) / scale).clip(0, img_height)
         
         inference_time = (time.time() - start_time) * 1000
         
-        # Process results
-        detections = []
+        # Process results (whole-array operations; Python only builds the dicts)
+        class_ids = pred[:, 5].astype(np.int32)
         
-        # Get predictions (xyxy format)
-        pred = results.xyxy[0].cpu().numpy()  # [x1, y1, x2, y2, conf, class]
+        # Filter by class if specified
+        if classes_filter:
+            keep = np.isin(class_ids, [CLASS_IDS[name] for name in classes_filter if name in CLASS_IDS])
+            pred, class_ids = pred[keep], class_ids[keep]
         
-        # Get image dimensions
-        img_height, img_width = image.shape[:2]
+        # Normalize bbox to [0, 1]
+        bbox_norm = pred[:, :4] / np.array([img_width, img_height, img_width, img_height], dtype=np.float32)
         
-        for detection in pred:
-            x1, y1, x2, y2, conf, cls = detection
-            
-            class_id = int(cls)
-            class_name = COCO_CLASSES[class_id] if class_id < len(COCO_CLASSES) else f'class_{class_id}'
-            
-            # Filter by class if specified
-            if classes_filter and class_name not in classes_filter:
-                continue
-            
-            # Normalize bbox to [0, 1]
-            x1_norm = x1 / img_width
-            y1_norm = y1 / img_height
-            x2_norm = x2 / img_width
-            y2_norm = y2 / img_height
-            
-            detections.append({
+        detections = [
+            {
                 'class_id': class_id,
-                'class_name': class_name,
-                'confidence': float(conf),
-                'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                'bbox_norm': [float(x1_norm), float(y1_norm), float(x2_norm), float(y2_norm)]
-            })
+                'class_name': COCO_CLASSES[class_id] if class_id < len(COCO_CLASSES) else f'class_{class_id}',
+                'confidence': conf,
+                'bbox': bbox,
+                'bbox_norm': norm
+            }
+            for class_id, conf, bbox, norm in zip(
+                class_ids.tolist(),
+                pred[:, 4].tolist(),
+                pred[:, :4].astype(np.int32).tolist(),
+                bbox_norm.tolist()
+            )
+        ]
         
         logger.info(f"Inference: {inference_time:.1f}ms, Detections: {len(detections)}")
         
@@ -195,13 +805,21 @@ def run_inference(image, threshold=0.6, classes_filter=None):
 # Flask Routes
 # ============================================
 
+def json_response(data):
+    """jsonify(data), serialized with orjson when it's installed"""
+    if ORJSON_AVAILABLE:
+        return Response(orjson.dumps(data), mimetype='application/json')
+    return jsonify(data)
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({
         'status': 'ok',
         'service': 'HomePi AI Inference',
-        'backend': 'pytorch',
+        'backend': backend,
+        'precision': precision,
         'model': 'YOLOv5s',
         'device': device,
         'model_loaded': model_loaded,
@@ -211,26 +829,52 @@ def health():
 
 @app.route('/detect', methods=['POST'])
 def detect():
-    """Object detection endpoint"""
+    """
+    Object detection endpoint
+    
+    Takes either a raw JPEG body (Content-Type image/jpeg, with optional
+    X-Threshold and comma separated X-Classes headers) or the older JSON
+    body with a base64 'image'.
+    """
     try:
-        data = request.json
-        
-        if 'image' not in data:
-            return jsonify({'error': 'No image provided'}), 400
+        if request.mimetype in ('image/jpeg', 'application/octet-stream'):
+            img_bytes = request.get_data()
+            if not img_bytes:
+                return jsonify({'error': 'No image provided'}), 400
+            
+            # Get parameters
+            try:
+                threshold = float(request.headers.get('X-Threshold', 0.6))
+            except ValueError:
+                return jsonify({'error': 'X-Threshold must be a number'}), 400
+            if not 0 <= threshold <= 1:
+                return jsonify({'error': 'X-Threshold must be between 0 and 1'}), 400
+            classes_filter = [
+                name.strip() for name in request.headers.get('X-Classes', '').split(',') if name.strip()
+            ] or None
+            
+            # Decode image
+            image = decode_jpeg(img_bytes)
+        else:
+            data = orjson.loads(request.get_data()) if ORJSON_AVAILABLE else request.json
+            
+            if 'image' not in data:
+                return jsonify({'error': 'No image provided'}), 400
+            
+            # Decode image
+            image = decode_image(data['image'])
+            
+            # Get parameters
+            threshold = data.get('threshold', 0.6)
+            classes_filter = data.get('classes', None)
         
-        # Decode image
-        image = decode_image(data['image'])
         if image is None:
             return jsonify({'error': 'Failed to decode image'}), 400
         
-        # Get parameters
-        threshold = data.get('threshold', 0.6)
-        classes_filter = data.get('classes', None)
-        
         # Run inference
         detections = run_inference(image, threshold, classes_filter)
         
-        return jsonify({
+        return json_response({
             'success': True,
             'detections': detections,
             'count': len(detections)
@@ -261,6 +905,10 @@ if __name__ == '__main__':
     
     print()
     
+    # One-off INT8 calibration: inference_server.py --calibrate <frames dir>
+    if len(sys.argv) == 3 and sys.argv[1] == '--calibrate':
+        exit(0 if calibrate(sys.argv[2]) else 1)
+    
     # Load model on startup
     if load_model():
         print("✓ Model loaded successfully")
@@ -6,11 +6,12 @@ Sends frames to remote AI service (Nvidia Jetson Orin) for inference
 import json
 import time
 import os
-import base64
 import logging
 import numpy as np
 import requests
 from io import BytesIO
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 # OpenCV for image encoding
 cv2_available = False
@@ -20,6 +21,15 @@ try:
 except ImportError:
     print("⚠ OpenCV not available")
 
+# PyTurboJPEG (libjpeg-turbo SIMD) is fastest and encodes RGB frames
+# without a colour conversion; needs the system libturbojpeg
+turbojpeg = None
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    turbojpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    pass
+
 # PIL as fallback
 PIL_available = False
 try:
@@ -36,6 +46,33 @@ detector_config = {}
 remote_url = None
 session = None
 
+# Frames allowed in flight to the remote service at once, so the next frame
+# is encoded and sent while the previous one is being inferred
+MAX_IN_FLIGHT = 2
+detect_executor = ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT, thread_name_prefix='detect')
+
+# Frames are downscaled to this longest side before being sent (the
+# server's largest input size)
+MAX_SEND_SIZE = 640
+
+# Box colors used by draw_detections()
+COLOR_BY_CLASS = {
+    'car': (0, 255, 0),      # Green for vehicles
+    'truck': (0, 255, 0),
+    'person': (0, 0, 255),   # Red for people
+}
+DEFAULT_COLOR = (255, 0, 0)  # Blue for others
+
+# A frame whose dHash is within STATIC_FRAME_BITS bits of the last frame
+# sent reuses that frame's detections, for up to STATIC_FRAME_MAX_AGE seconds
+# so a small change the hash misses is still picked up
+STATIC_FRAME_BITS = 2
+STATIC_FRAME_MAX_AGE = 1.0
+last_frame = None  # (hash, threshold, shape, sent at, detections)
+
+# Reused by draw_detections() when no output buffer is given
+draw_buffer = None
+
 
 def load_config():
     """Load detection configuration from config.json"""
@@ -78,7 +115,6 @@ def init_detector(url=None):
     try:
         # Create persistent session for better performance
         session = requests.Session()
-        session.headers.update({'Content-Type': 'application/json'})
         
         # Test connection to remote service
         print(f"Connecting to remote AI service: {remote_url}")
@@ -90,6 +126,7 @@ def init_detector(url=None):
             print(f"  Service: {info.get('service', 'Unknown')}")
             print(f"  Model: {info.get('model', 'Unknown')}")
             print(f"  Device: {info.get('device', 'Unknown')}")
+            print(f"  Precision: {info.get('precision', 'Unknown')}")
             detector_enabled = True
             return True
         else:
@@ -107,17 +144,46 @@ def init_detector(url=None):
         return False
 
 
-def encode_frame(frame, quality=85):
+def downscale_frame(frame, max_size=MAX_SEND_SIZE):
+    """
+    Shrink frame so its longest side is at most max_size (aspect kept)
+    
+    The server letterboxes to at most 640 anyway, so frames are shrunk
+    before encoding: far less to encode and send. Detections come back
+    normalized, so nothing changes for the caller.
+    """
+    height, width = frame.shape[:2]
+    if cv2_available and max_size and max(height, width) > max_size:
+        scale = max_size / max(height, width)
+        frame = cv2.resize(
+            frame,
+            (round(width * scale), round(height * scale)),
+            interpolation=cv2.INTER_AREA
+        )
+    return frame
+
+
+def encode_frame(frame, quality=85, max_size=MAX_SEND_SIZE):
     """
-    Encode frame to JPEG and base64 for transmission
+    Encode frame to JPEG for transmission
     
     Args:
         frame: numpy array (RGB format)
         quality: JPEG quality (1-100)
+        max_size: Longest side to send; larger frames are downscaled first
+            (None to send full size)
     
     Returns:
-        str: Base64 encoded JPEG string
+        bytes: JPEG data
     """
+    frame = downscale_frame(frame, max_size)
+    
+    if turbojpeg is not None:
+        try:
+            return turbojpeg.encode(frame, quality=quality, pixel_format=TJPF_RGB)
+        except Exception as e:
+            print(f"Error encoding frame with TurboJPEG: {e}")
+    
     if cv2_available:
         try:
             # Convert RGB to BGR for OpenCV
@@ -126,10 +192,7 @@ def encode_frame(frame, quality=85):
             # Encode to JPEG
             success, buffer = cv2.imencode('.jpg', bgr_frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
             if success:
-                # Encode to base64
-                jpg_bytes = buffer.tobytes()
-                b64_str = base64.b64encode(jpg_bytes).decode('utf-8')
-                return b64_str
+                return buffer.tobytes()
         except Exception as e:
             print(f"Error encoding frame with OpenCV: {e}")
     
@@ -142,17 +205,23 @@ def encode_frame(frame, quality=85):
             # Encode to JPEG
             buffer = BytesIO()
             pil_img.save(buffer, format='JPEG', quality=quality)
-            jpg_bytes = buffer.getvalue()
-            
-            # Encode to base64
-            b64_str = base64.b64encode(jpg_bytes).decode('utf-8')
-            return b64_str
+            return buffer.getvalue()
         except Exception as e:
             print(f"Error encoding frame with PIL: {e}")
     
     return None
 
 
+def frame_hash(frame):
+    """
+    64-bit difference hash (dHash) of a frame
+    
+    Nearly identical frames get hashes a few bits apart at most.
+    """
+    small = cv2.cvtColor(cv2.resize(frame, (9, 8), interpolation=cv2.INTER_AREA), cv2.COLOR_RGB2GRAY)
+    return int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), 'big')
+
+
 def detect_objects(frame, threshold=None):
     """
     Run object detection on frame using remote AI service
@@ -172,7 +241,7 @@ def detect_objects(frame, threshold=None):
             ...
         ]
     """
-    global detector_enabled, detector_config, remote_url, session
+    global detector_enabled, detector_config, remote_url, session, last_frame
     
     if not detector_enabled or not session:
         return []
@@ -180,18 +249,31 @@ def detect_objects(frame, threshold=None):
     if threshold is None:
         threshold = detector_config.get('confidence_threshold', 0.6)
     
+    # Downscale once: the hash and the JPEG both work from the small frame
+    small = downscale_frame(frame)
+    
+    # Static scene: reuse the last detections instead of a round trip
+    key = frame_hash(small) if cv2_available else None
+    if key is not None and last_frame is not None:
+        last_key, last_threshold, last_shape, sent_at, last_detections = last_frame
+        if (bin(key ^ last_key).count('1') <= STATIC_FRAME_BITS
+                and threshold == last_threshold and frame.shape == last_shape
+                and time.monotonic() - sent_at < STATIC_FRAME_MAX_AGE):
+            return [dict(det) for det in last_detections]
+    
     try:
         # Encode frame
-        b64_frame = encode_frame(frame, quality=85)
-        if not b64_frame:
+        jpg_bytes = encode_frame(small, quality=85)
+        if not jpg_bytes:
             print("Failed to encode frame")
             return []
         
-        # Prepare request
-        payload = {
-            'image': b64_frame,
-            'threshold': threshold,
-            'classes': detector_config.get('classes_of_interest', [])
+        # Send the JPEG as the raw body (no base64/JSON wrapping) with the
+        # parameters in headers
+        headers = {
+            'Content-Type': 'image/jpeg',
+            'X-Threshold': str(threshold),
+            'X-Classes': ','.join(detector_config.get('classes_of_interest', []))
         }
         
         # Send to remote service
@@ -200,7 +282,8 @@ def detect_objects(frame, threshold=None):
         
         response = session.post(
             f"{remote_url}/detect",
-            json=payload,
+            data=jpg_bytes,
+            headers=headers,
             timeout=timeout
         )
         
@@ -222,6 +305,11 @@ def detect_objects(frame, threshold=None):
                         int(y2_norm * frame_height)
                     )
             
+            if key is not None:
+                # Cache copies, so a caller editing its result (e.g. adding
+                # tracking keys) can't change what later cache hits return
+                last_frame = (key, threshold, frame.shape, time.monotonic(), tuple(dict(det) for det in detections))
+            
             # Debug logging
             if detections:
                 logger.debug(f"Inference: {inference_time:.1f}ms, Detections: {len(detections)}")
@@ -243,6 +331,17 @@ def detect_objects(frame, threshold=None):
         return []
 
 
+def detect_objects_async(frame, threshold=None):
+    """
+    Start detect_objects(frame) in the background
+    
+    Returns:
+        Future resolving to the detections list; callers should keep at most
+        MAX_IN_FLIGHT outstanding and drop frames rather than queue them
+    """
+    return detect_executor.submit(detect_objects, frame, threshold)
+
+
 def filter_detections(detections, classes_of_interest=None):
     """
     Filter detections by class names
@@ -265,35 +364,67 @@ def filter_detections(detections, classes_of_interest=None):
     return filtered
 
 
-def draw_detections(frame, detections):
-    """Draw bounding boxes and labels on frame"""
+@lru_cache(maxsize=512)
+def render_label(label, color):
+    """
+    Render a detection label (white text on a filled color box) once
+    
+    Labels repeat from frame to frame (same class, same rounded confidence),
+    so they're rasterized once and blitted afterwards.
+    
+    Returns:
+        numpy array (RGB) of the label box; treat as read-only
+    """
+    (width, height), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)
+    label_img = np.empty((height + 11, width + 1, 3), dtype=np.uint8)
+    label_img[:] = color
+    cv2.putText(label_img, label, (0, height + 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+    return label_img
+
+
+def draw_detections(frame, detections, out=None):
+    """
+    Draw bounding boxes and labels on a copy of frame
+    
+    Args:
+        frame: Input image (left unmodified)
+        detections: Detections from detect_objects()
+        out: Array to draw into (same shape/dtype as frame); by default a
+            module buffer reused across calls, so copy the result to keep it
+    
+    Returns:
+        The annotated image (out)
+    """
+    global draw_buffer
+    
     if not cv2_available:
         return frame
     
-    # Make a copy to avoid modifying original
-    annotated = frame.copy()
+    # Copy into a reused buffer instead of allocating a new frame every call
+    if out is None:
+        if draw_buffer is None or draw_buffer.shape != frame.shape or draw_buffer.dtype != frame.dtype:
+            draw_buffer = np.empty_like(frame)
+        out = draw_buffer
+    np.copyto(out, frame)
+    annotated = out
     
     for det in detections:
         x1, y1, x2, y2 = det['bbox']
         class_name = det['class_name']
         confidence = det['confidence']
         
-        # Choose color based on class
-        if 'car' in class_name or 'truck' in class_name:
-            color = (0, 255, 0)  # Green for vehicles
-        elif 'person' in class_name:
-            color = (0, 0, 255)  # Red for people
-        else:
-            color = (255, 0, 0)  # Blue for others
+        color = COLOR_BY_CLASS.get(class_name, DEFAULT_COLOR)
         
         # Draw bounding box
         cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 2)
         
-        # Draw label
-        label = f"{class_name} {confidence:.2f}"
-        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
-        cv2.rectangle(annotated, (x1, y1 - label_size[1] - 10), (x1 + label_size[0], y1), color, -1)
-        cv2.putText(annotated, label, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+        # Draw label (bottom-left corner at x1, y1, clipped to the frame)
+        label_img = render_label(f"{class_name} {confidence:.2f}", color)
+        top = y1 + 1 - label_img.shape[0]
+        rows = slice(max(top, 0), min(y1 + 1, annotated.shape[0]))
+        cols = slice(max(x1, 0), min(x1 + label_img.shape[1], annotated.shape[1]))
+        if rows.start < rows.stop and cols.start < cols.stop:
+            annotated[rows, cols] = label_img[rows.start - top:rows.stop - top, cols.start - x1:cols.stop - x1]
     
     return annotated
 
@@ -7,6 +7,8 @@ import json
 import time
 import threading
 import math
+from functools import lru_cache
+import numpy as np
 
 # Pan-Tilt HAT will be imported only when available
 pantilt_available = False
@@ -16,6 +18,17 @@ try:
 except ImportError as e:
     print(f"⚠ Pan-Tilt HAT not available: {e}")
 
+# Pan-Tilt HAT servo registers: two adjacent little-endian words holding
+# the pulse widths in microseconds, so one block write sets both servos
+PANTILT_ADDRESS = 0x15
+REG_SERVO1 = 0x01
+# Seconds between servo writes made through pantilthat itself, which
+# re-enables the servos and restarts the HAT's idle timeout; writes in
+# between go straight to the bus
+SERVO_REFRESH_INTERVAL = 1.0
+# Device tree clock of the I2C bus the HAT is on (big-endian u32, Hz)
+I2C_CLOCK_PATH = '/sys/class/i2c-adapter/i2c-1/of_node/clock-frequency'
+
 # Global state
 pantilt_config = {}
 pantilt_enabled = False
@@ -24,6 +37,8 @@ current_tilt = 0
 patrol_thread = None
 patrol_active = False
 tracking_active = False
+servo_bus = None
+servo_refreshed_at = 0
 
 
 def load_config():
@@ -44,25 +59,53 @@ def load_config():
             'patrol_enabled': False,
             'tracking_enabled': True,
             'patrol_speed': 2,
-            'tracking_speed': 5
+            'tracking_speed': 5,
+            'i2c_baudrate': 400000
         }
 
 
+def check_i2c_baudrate():
+    """
+    Warn if the I2C bus runs slower than pantilt_config['i2c_baudrate']
+    
+    The clock is set at boot (dtparam=i2c_arm_baudrate in /boot/config.txt);
+    at the 100 kHz default each servo write spends several times longer on
+    the wire.
+    """
+    wanted = pantilt_config.get('i2c_baudrate')
+    if not wanted:
+        return
+    
+    try:
+        with open(I2C_CLOCK_PATH, 'rb') as f:
+            actual = int.from_bytes(f.read(4), 'big')
+    except OSError:
+        return
+    
+    if actual < wanted:
+        print(f"⚠ I2C bus at {actual // 1000} kHz, configured for {wanted // 1000} kHz")
+        print(f"  Add dtparam=i2c_arm_baudrate={wanted} to /boot/config.txt and reboot")
+
+
 def init_pantilt():
     """Initialize Pan-Tilt HAT"""
-    global pantilt_enabled, pantilt_config, current_pan, current_tilt
+    global pantilt_enabled, pantilt_config, current_pan, current_tilt, servo_bus
     
     if not pantilt_available:
         print("Pan-Tilt HAT not available")
         return False
     
     pantilt_config = load_config()
+    check_i2c_baudrate()
     
     try:
         # Initialize servos
         pantilthat.pan(0)
         pantilthat.tilt(0)
         
+        # The I2C bus pantilthat opened, reused for block writes
+        servo_bus = getattr(pantilthat.pantilthat, '_i2c', None)
+        
         current_pan = 0
         current_tilt = 0
         pantilt_enabled = True
@@ -81,7 +124,53 @@ def init_pantilt():
         return False
 
 
-def move_to(pan, tilt, speed=5):
+def write_servos(pan, tilt, final=False):
+    """
+    Set both servos, in one I2C transaction where possible
+    
+    Args:
+        pan: Pan angle
+        tilt: Tilt angle
+        final: Last write of a move; goes through pantilthat so the idle
+            timeout counts from here
+    """
+    global servo_refreshed_at
+    
+    now = time.monotonic()
+    if servo_bus is None or final or now - servo_refreshed_at >= SERVO_REFRESH_INTERVAL:
+        pantilthat.pan(pan)
+        pantilthat.tilt(tilt)
+        servo_refreshed_at = now
+        return
+    
+    hat = pantilthat.pantilthat
+    pan_us = hat._servo_degrees_to_us(pan, *hat._servo_range(0))
+    tilt_us = hat._servo_degrees_to_us(tilt, *hat._servo_range(1))
+    servo_bus.write_i2c_block_data(
+        PANTILT_ADDRESS, REG_SERVO1,
+        [pan_us & 0xFF, pan_us >> 8, tilt_us & 0xFF, tilt_us >> 8]
+    )
+
+
+@lru_cache(maxsize=64)
+def make_ramp(start_pan, start_tilt, pan, tilt, steps, ease):
+    """
+    Servo positions for a smooth move, cached since patrols repeat the
+    same few moves
+    
+    Returns:
+        tuple: (pans, tilts), steps + 1 integer angles each
+    """
+    progress = np.linspace(0, 1, steps + 1)
+    if ease:
+        # Cubic Hermite ease-in/out: zero velocity at both ends
+        progress = progress * progress * (3 - 2 * progress)
+    pans = (start_pan + (pan - start_pan) * progress).astype(int)
+    tilts = (start_tilt + (tilt - start_tilt) * progress).astype(int)
+    return tuple(pans.tolist()), tuple(tilts.tolist())
+
+
+def move_to(pan, tilt, speed=5, ease=True):
     """
     Move to specified pan/tilt position with speed control
     
@@ -89,6 +178,8 @@ def move_to(pan, tilt, speed=5):
         pan: Pan angle (-90 to +90)
         tilt: Tilt angle (-90 to +90)
         speed: Movement speed (1-10, higher is faster)
+        ease: Accelerate and decelerate smoothly rather than moving at a
+            constant rate (which jerks at both ends)
     """
     global current_pan, current_tilt, pantilt_enabled
     
@@ -108,19 +199,18 @@ def move_to(pan, tilt, speed=5):
         steps = int(steps / speed) if steps > speed else 1
         
         if steps > 1:
-            # Smooth movement
-            for i in range(steps + 1):
-                progress = i / steps
-                intermediate_pan = current_pan + (pan - current_pan) * progress
-                intermediate_tilt = current_tilt + (tilt - current_tilt) * progress
-                
-                pantilthat.pan(int(intermediate_pan))
-                pantilthat.tilt(int(intermediate_tilt))
-                time.sleep(0.02)
+            # Smooth movement: the whole ramp is computed up front, so the
+            # loop only writes to the servos
+            pans, tilts = make_ramp(current_pan, current_tilt, pan, tilt, steps, ease)
+            write, sleep = write_servos, time.sleep
+            for step_pan, step_tilt in zip(pans[:-1], tilts[:-1]):
+                write(step_pan, step_tilt)
+                sleep(0.02)
+            write(pans[-1], tilts[-1], final=True)
+            sleep(0.02)
         else:
             # Direct movement
-            pantilthat.pan(int(pan))
-            pantilthat.tilt(int(tilt))
+            write_servos(int(pan), int(tilt), final=True)
         
         current_pan = pan
         current_tilt = tilt
@@ -150,21 +240,22 @@ def patrol_loop():
     patrol_speed = pantilt_config.get('patrol_speed', 2)
     pan_limits = pantilt_config.get('pan_limits', [-90, 90])
     
-    # Patrol pattern: sweep left to right
+    # Patrol pattern: sweep left to right, in small constant-rate moves
+    # (easing each would make the sweep pulse)
     while patrol_active:
         if not tracking_active:
             # Sweep right
             for pan in range(int(current_pan), pan_limits[1], patrol_speed):
                 if not patrol_active or tracking_active:
                     break
-                move_to(pan, 0, speed=1)
+                move_to(pan, 0, speed=1, ease=False)
                 time.sleep(0.1)
             
             # Sweep left
             for pan in range(int(current_pan), pan_limits[0], -patrol_speed):
                 if not patrol_active or tracking_active:
                     break
-                move_to(pan, 0, speed=1)
+                move_to(pan, 0, speed=1, ease=False)
                 time.sleep(0.1)
         else:
             time.sleep(0.5)
@@ -9,6 +9,7 @@ import json
 import time
 import threading
 import logging
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 import sqlite3
@@ -456,9 +457,25 @@ def detection_loop():
     
     logger.info("Detection loop started")
     detection_interval = security_config.get('detection', {}).get('detection_interval', 0.1)
+    # Detection requests still waiting on the remote service, oldest first
+    in_flight = deque()
     
     while detection_running:
         try:
+            # Process finished detections in order
+            while in_flight and in_flight[0].done():
+                detections = in_flight.popleft().result()
+                if detections:
+                    handle_detection(detections)
+                    # Tracking corrections are relative to the current
+                    # position, so results for frames captured before the
+                    # move would repeat it; drop them
+                    if tracking_target is not None and pantilt_controller.is_enabled():
+                        in_flight.clear()
+                else:
+                    # No detections, reset tracking
+                    tracking_target = None
+            
             # Get current frame
             frame = camera_manager.get_frame()
             
@@ -466,15 +483,10 @@ def detection_loop():
                 time.sleep(detection_interval)
                 continue
             
-            # Run object detection
-            detections = object_detector.detect_objects(frame)
-            
-            # Process detections
-            if detections:
-                handle_detection(detections)
-            else:
-                # No detections, reset tracking
-                tracking_target = None
+            # Run object detection in the background, keeping a couple of
+            # frames in flight; drop this frame if the service is behind
+            if len(in_flight) < object_detector.MAX_IN_FLIGHT:
+                in_flight.append(object_detector.detect_objects_async(frame))
             
             # Sleep for detection interval
             time.sleep(detection_interval)
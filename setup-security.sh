@@ -65,6 +65,7 @@ sudo apt-get install -y \
     libcap-dev \
     libopenblas-dev \
     libjpeg-dev \
+    libturbojpeg0 \
     libopenjp2-7 \
     libtiff6 \
     v4l-utils \
@@ -88,6 +89,16 @@ else
     print_success "I2C already enabled"
 fi
 
+# Servo updates are I2C-bound: run the bus at 400 kHz fast mode (the
+# fastest every HomePi I2C device supports) rather than the 100 kHz default.
+# Keep pantilt.i2c_baudrate in config.json in step with this
+if ! grep -q "i2c_arm_baudrate" /boot/config.txt; then
+    echo "dtparam=i2c_arm_baudrate=400000" | sudo tee -a /boot/config.txt
+    print_success "I2C clock set to 400 kHz (reboot required)"
+else
+    print_success "I2C clock already configured"
+fi
+
 # Add user to i2c group
 sudo usermod -a -G i2c $USER
 
@@ -248,7 +248,7 @@ def test_flipper():
         for port in ports:
             if os.path.exists(port):
                 print_info(f"Trying {port}...")
-                if flipper_controller.init_flipper(port):
+                if flipper_controller.init_flipper(port, probe=True):
                     print_success(f"Flipper connected on {port}")
                     connected = True
                     break
@@ -263,7 +263,7 @@ def test_flipper():
         
         # Test communication
         print_info("Testing communication...")
-        response = flipper_controller.send_command("device_info", wait_response=True)
+        response = flipper_controller.send_command(flipper_controller.CMD_DEVICE_INFO, wait_response=True, flush_input=True)
         if response:
             print_success("Flipper is responding")
             print(f"  Response: {response[:100]}...")